@@ -12,8 +12,8 @@ from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from channels.channel_manager import channel_manager, ChannelInfo
-from formats.converter_factory import ConverterFactory, convert_request, convert_response
+from src.channels.channel_manager import channel_manager, ChannelInfo
+from src.formats.converter_factory import ConverterFactory, convert_request, convert_response
 from src.utils.logger import setup_logger
 from src.utils.exceptions import ChannelNotFoundError, ConversionError, APIError, TimeoutError
 from src.utils.http_client import get_http_client
@@ -192,7 +192,7 @@ async def create_channel(request: ChannelCreateRequest, _: bool = Depends(get_se
 async def list_channels(_: bool = Depends(get_session_user)):
     """获取所有渠道"""
     try:
-        channels = channel_manager.get_all_channels()
+        channels = channel_manager.get_all_channels(include_keys=False)
         return {
             "success": True,
             "channels": [
@@ -356,6 +356,19 @@ async def gemini_generate_content(request: Request):
     return await handle_conversion_request(request, "gemini")
 
 
+def select_channel(provider: str) -> ChannelInfo:
+    """选择第一个可用渠道，只为它解密密钥（走渠道缓存）；没有可用渠道时返回503"""
+    channels = channel_manager.get_channels_by_provider(provider, include_keys=False)
+    # 列表查询与按id读取之间渠道可能已被删除
+    channel = channel_manager.get_channel(channels[0].id) if channels else None
+    if channel is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"No available {provider} channels configured"
+        )
+    return channel
+
+
 async def handle_conversion_request(request: Request, target_format: str):
     """处理转换请求的通用逻辑"""
     try:
@@ -373,15 +386,7 @@ async def handle_conversion_request(request: Request, target_format: str):
         # 如果源格式和目标格式相同，直接转发
         if source_format == target_format:
             # 根据目标格式找到合适的渠道
-            channels = channel_manager.get_channels_by_provider(target_format)
-            if not channels:
-                raise HTTPException(
-                    status_code=503,
-                    detail=f"No available {target_format} channels configured"
-                )
-            
-            # 选择第一个可用渠道
-            channel = channels[0]
+            channel = select_channel(target_format)
             
             # 直接转发请求
             response_data = await forward_request(channel, request_data, headers)
@@ -397,15 +402,7 @@ async def handle_conversion_request(request: Request, target_format: str):
             )
         
         # 找到目标格式的渠道
-        channels = channel_manager.get_channels_by_provider(target_format)
-        if not channels:
-            raise HTTPException(
-                status_code=503,
-                detail=f"No available {target_format} channels configured"
-            )
-        
-        # 选择第一个可用渠道
-        channel = channels[0]
+        channel = select_channel(target_format)
         
         # 转发请求
         response_data = await forward_request(channel, conversion_result.data, headers)
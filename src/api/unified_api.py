@@ -3,6 +3,7 @@
 支持通过自定义key调用不同的AI服务，自动进行格式转换
 """
 import json
+import logging
 import time
 from datetime import datetime
 from typing import Dict, Any, Optional, List
@@ -11,10 +12,10 @@ from fastapi import APIRouter, HTTPException, Request, Response, Depends, Header
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from channels.channel_manager import channel_manager, ChannelInfo
-from formats.converter_factory import ConverterFactory, convert_request, convert_response, convert_streaming_chunk
-from formats.base_converter import ConversionResult
-from utils.security import mask_api_key, safe_log_request, safe_log_response
+from src.channels.channel_manager import channel_manager, ChannelInfo
+from src.formats.converter_factory import ConverterFactory, convert_request, convert_response, convert_streaming_chunk
+from src.formats.base_converter import ConversionResult
+from src.utils.security import mask_api_key, safe_log_request, safe_log_response
 from src.utils.logger import setup_logger
 from src.utils.exceptions import ChannelNotFoundError, ConversionError, APIError, TimeoutError
 from src.utils.http_client import get_http_client
@@ -23,6 +24,27 @@ logger = setup_logger("unified_api")
 
 router = APIRouter()
 
+# 模型名称片段 -> tiktoken编码对应的模型（按顺序匹配）
+_TIKTOKEN_MODEL_FAMILIES = (
+    ("gpt-4", "gpt-4"),
+    ("gpt-3.5", "gpt-3.5-turbo"),
+)
+
+_stdlib_dumps_chunk = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+try:
+    import orjson  # 可选依赖：C/Rust实现，序列化流式chunk更快
+
+    def _dumps_chunk(data: Any) -> str:
+        """序列化流式chunk为紧凑JSON字符串"""
+        try:
+            return orjson.dumps(data).decode()
+        except TypeError:
+            # orjson不支持的数据（如非字符串键、超大整数）回退到标准库
+            return _stdlib_dumps_chunk(data)
+except ImportError:
+    _dumps_chunk = _stdlib_dumps_chunk
+
 
 async def fetch_models_from_channel_for_format(channel: ChannelInfo, target_format: str) -> List[Dict[str, Any]]:
     """从目标渠道获取模型列表并转换为指定格式"""
@@ -439,7 +461,8 @@ async def forward_request_to_channel(
     # 3. 统一请求处理
     try:
         logger.debug(f"Sending {'streaming' if is_streaming else 'non-streaming'} request to {channel.provider}: {url}")
-        logger.debug(f"Request data: {safe_log_request(conversion_result.data)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Request data: {safe_log_request(conversion_result.data)}")
         
         # 检查渠道是否配置了代理
         if getattr(channel, 'use_proxy', False):
@@ -639,7 +662,7 @@ async def handle_streaming_response(response, channel, request_data, source_form
                         import traceback
                         logger.error(f"Traceback: {traceback.format_exc()}")
                         # 发送原始数据作为后备，然后继续处理下一个chunk
-                        yield f"data: {json.dumps(chunk_data, ensure_ascii=False)}\n\n"
+                        yield f"data: {_dumps_chunk(chunk_data)}\n\n"
                         continue
                     
                     if response_conversion and response_conversion.success:
@@ -658,12 +681,13 @@ async def handle_streaming_response(response, channel, request_data, source_form
                                     yield ev
                         else:
                             # 如果是JSON对象（OpenAI/Gemini），包装成data字段
-                            logger.debug(f"Sending JSON chunk {chunk_count} to client: {json.dumps(converted_data, ensure_ascii=False)}")
-                            yield f"data: {json.dumps(converted_data, ensure_ascii=False)}\n\n"
+                            chunk_json = _dumps_chunk(converted_data)
+                            logger.debug(f"Sending JSON chunk {chunk_count} to client: {chunk_json}")
+                            yield f"data: {chunk_json}\n\n"
                     else:
                         # 如果转换失败，返回原始数据
                         logger.warning(f"Conversion failed: {response_conversion.error}")
-                        yield f"data: {json.dumps(chunk_data, ensure_ascii=False)}\n\n"
+                        yield f"data: {_dumps_chunk(chunk_data)}\n\n"
                 
                 # 检查是否是结束chunk（各种格式的结束标记）
                 # 注意：如果chunk既有内容又是结束，避免重复处理（内容处理时已经处理了结束逻辑）
@@ -687,7 +711,7 @@ async def handle_streaming_response(response, channel, request_data, source_form
                         import traceback
                         logger.error(f"Traceback: {traceback.format_exc()}")
                         # 发送原始数据作为后备
-                        yield f"data: {json.dumps(chunk_data, ensure_ascii=False)}\n\n"
+                        yield f"data: {_dumps_chunk(chunk_data)}\n\n"
                         if end_marker:  # 只有非空的end_marker才发送
                             yield end_marker
                         break
@@ -705,8 +729,9 @@ async def handle_streaming_response(response, channel, request_data, source_form
                                 logger.debug(f"Sending finish chunk: {converted_data[:100]}...")
                                 yield converted_data
                         else:
-                            logger.debug(f"Sending finish chunk to client: {json.dumps(converted_data, ensure_ascii=False)}")
-                            yield f"data: {json.dumps(converted_data, ensure_ascii=False)}\n\n"
+                            chunk_json = _dumps_chunk(converted_data)
+                            logger.debug(f"Sending finish chunk to client: {chunk_json}")
+                            yield f"data: {chunk_json}\n\n"
                     
                     # 发送结束标记
                     if end_marker:  # 只有非空的end_marker才发送
@@ -751,7 +776,7 @@ async def handle_streaming_response(response, channel, request_data, source_form
                     "finish_reason": "stop"
                 }]
             }
-            yield f"data: {json.dumps(error_chunk, ensure_ascii=False)}\n\n"
+            yield f"data: {_dumps_chunk(error_chunk)}\n\n"
             if end_marker:  # 只有非空的end_marker才发送
                 yield end_marker
     else:
@@ -767,7 +792,8 @@ def handle_non_streaming_response(response, channel, request_data, source_format
     # 处理非流式响应
     if response.status_code == 200:
         response_data = response.json()
-        logger.debug(f"Received response from {channel.provider}: {safe_log_response(response_data)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Received response from {channel.provider}: {safe_log_response(response_data)}")
         
         # 检查是否为同格式透传
         if channel.provider == source_format:
@@ -792,7 +818,8 @@ def handle_non_streaming_response(response, channel, request_data, source_format
             if not conversion_result.success:
                 raise ConversionError(f"Response conversion failed: {conversion_result.error}")
             
-            logger.debug(f"Converted response: {safe_log_response(conversion_result.data)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Converted response: {safe_log_response(conversion_result.data)}")
             return conversion_result.data
     
     # 处理 429 限流错误，返回带重试建议的响应
@@ -854,7 +881,7 @@ async def list_models_unified(
         else:
             raise HTTPException(status_code=401, detail="Missing authorization header")
         
-        channel = channel_manager.get_channel_by_custom_key(api_key)
+        channel = await channel_manager.aget_channel_by_custom_key(api_key)
         if not channel:
             logger.error(f"No channel found for API key: {mask_api_key(api_key)}")
             raise HTTPException(status_code=401, detail="Invalid API key")
@@ -896,7 +923,7 @@ async def list_gemini_models(api_key: str = Depends(extract_gemini_api_key)):
     try:
         logger.info(f"Gemini format models request with API key: {mask_api_key(api_key)}")
         
-        channel = channel_manager.get_channel_by_custom_key(api_key)
+        channel = await channel_manager.aget_channel_by_custom_key(api_key)
         if not channel:
             logger.error(f"No channel found for API key: {mask_api_key(api_key)}")
             raise HTTPException(status_code=401, detail="Invalid API key")
@@ -1005,11 +1032,11 @@ async def unified_gemini_count_tokens_endpoint(
         # 对于countTokens，只需要contents字段
         # 应用模型映射（如果配置）
         logger.debug(f"Looking for channel with custom_key: {mask_api_key(api_key)}")
-        channel = channel_manager.get_channel_by_custom_key(api_key)
+        channel = await channel_manager.aget_channel_by_custom_key(api_key)
         if not channel:
             logger.error(f"No available channel found for API key: {mask_api_key(api_key)}")
             # 列出所有可用的渠道用于调试
-            all_channels = channel_manager.get_all_channels()
+            all_channels = channel_manager.get_all_channels(include_keys=False)
             logger.info(f"Available channels: {[(ch.custom_key, ch.provider) for ch in all_channels]}")
             raise HTTPException(status_code=503, detail="No available channels")
 
@@ -1024,7 +1051,8 @@ async def unified_gemini_count_tokens_endpoint(
             "contents": request_data.get("contents", [])
         }
         
-        logger.debug(f"Count tokens request data: {safe_log_request(count_request_data)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Count tokens request data: {safe_log_request(count_request_data)}")
         
         logger.info(f"Found channel: {channel.name} (provider: {channel.provider}, custom_key: {channel.custom_key})")
         
@@ -1055,7 +1083,7 @@ async def handle_unified_request(request, api_key: str, source_format: str):
         logger.debug(f"Processing request: source_format={source_format}, api_key={mask_api_key(api_key)}")
         
         # 1. 根据key识别目标渠道
-        channel = channel_manager.get_channel_by_custom_key(api_key)
+        channel = await channel_manager.aget_channel_by_custom_key(api_key)
         if not channel:
             logger.error(f"No channel found for api_key: {mask_api_key(api_key)}")
             raise HTTPException(status_code=401, detail="Invalid API key")
@@ -1110,7 +1138,8 @@ async def handle_unified_request(request, api_key: str, source_format: str):
             )
             
             logger.debug(f"Final response data type: {type(response_data)}")
-            logger.debug(f"Final response data: {safe_log_response(response_data)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Final response data: {safe_log_response(response_data)}")
             
             # 使用JSONResponse确保正确的Content-Type和编码
             return JSONResponse(
@@ -1197,10 +1226,13 @@ async def handle_openai_count_tokens_for_gemini(channel: ChannelInfo, model_id:
         import tiktoken
         
         # 根据模型选择正确的编码
-        if "gpt-4" in model_id.lower():
-            encoding = tiktoken.encoding_for_model("gpt-4")
-        elif "gpt-3.5" in model_id.lower():
-            encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        model_lower = model_id.lower()
+        encoding_model = next(
+            (name for needle, name in _TIKTOKEN_MODEL_FAMILIES if needle in model_lower),
+            None
+        )
+        if encoding_model:
+            encoding = tiktoken.encoding_for_model(encoding_model)
         else:
             # 默认使用cl100k_base编码（适用于大多数现代模型）
             encoding = tiktoken.get_encoding("cl100k_base")
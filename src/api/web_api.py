@@ -10,16 +10,17 @@ from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from starlette.middleware.sessions import SessionMiddleware
 from pydantic import BaseModel
 
-from core.capability_detector import CapabilityDetectorFactory
-from core.openai_detector import OpenAICapabilityDetector
-from core.anthropic_detector import AnthropicCapabilityDetector
-from core.gemini_detector import GeminiCapabilityDetector
+from src.core.capability_detector import CapabilityDetectorFactory
+from src.core.openai_detector import OpenAICapabilityDetector
+from src.core.anthropic_detector import AnthropicCapabilityDetector
+from src.core.gemini_detector import GeminiCapabilityDetector
 from src.utils.config import ConfigManager, ChannelConfig
 from src.utils.logger import setup_logger
 from src.utils.auth import auth_manager
 from src.utils.security import mask_api_key
-from api.conversion_api import router as conversion_router
-from api.unified_api import router as unified_router
+from src.utils.http_client import aclose_http_clients
+from src.api.conversion_api import router as conversion_router
+from src.api.unified_api import router as unified_router
 
 app = FastAPI(title="AI API统一转换代理系统", version="1.0.0")
 logger = setup_logger("web_api")
@@ -56,6 +57,12 @@ app.add_middleware(SessionMiddleware, secret_key=secret_key)
 app.include_router(conversion_router, prefix="/api")  # 管理API
 app.include_router(unified_router)  # 统一转换API（直接挂载到根路径）
 
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """关闭共享的上游HTTP客户端连接池"""
+    await aclose_http_clients()
+
 # 注册检测器
 CapabilityDetectorFactory.register("openai", OpenAICapabilityDetector)
 CapabilityDetectorFactory.register("anthropic", AnthropicCapabilityDetector)
@@ -143,7 +150,7 @@ def get_optional_session_user(request: Request):
 
 
 def channel_info_to_config(channel_info) -> ChannelConfig:
-    """将ChannelInfo转换为ChannelConfig"""
+    """将ChannelInfo转换为ChannelConfig（渠道入库时已校验，不再重复校验）"""
     return ChannelConfig(
         provider=channel_info.provider,
         base_url=channel_info.base_url,
@@ -155,7 +162,8 @@ def channel_info_to_config(channel_info) -> ChannelConfig:
         proxy_host=getattr(channel_info, 'proxy_host', None),
         proxy_port=getattr(channel_info, 'proxy_port', None),
         proxy_username=getattr(channel_info, 'proxy_username', None),
-        proxy_password=getattr(channel_info, 'proxy_password', None)
+        proxy_password=getattr(channel_info, 'proxy_password', None),
+        validate=False
     )
 
 
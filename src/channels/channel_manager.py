@@ -37,9 +37,11 @@ class ChannelInfo:
     updated_at: str = ""
 
     def __post_init__(self):
-        if not self.created_at:
-            self.created_at = datetime.now().isoformat()
-        self.updated_at = datetime.now().isoformat()
+        # 从数据库加载时两个时间戳都已存在，不再每次构造都读时钟并格式化
+        if not self.created_at or not self.updated_at:
+            now = datetime.now().isoformat()
+            self.created_at = self.created_at or now
+            self.updated_at = self.updated_at or now
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ChannelInfo':
@@ -150,19 +152,24 @@ class ChannelManager:
         data = db_manager.get_channel_by_custom_key(custom_key)
         return ChannelInfo.from_dict(data) if data else None
 
-    def get_channels_by_provider(self, provider: str) -> List[ChannelInfo]:
-        """按提供商获取渠道列表"""
-        channels_data = db_manager.get_channels_by_provider(provider)
+    async def aget_channel_by_custom_key(self, custom_key: str) -> Optional[ChannelInfo]:
+        """根据自定义key获取渠道信息（异步，供请求处理路径使用）"""
+        data = await db_manager.aget_channel_by_custom_key(custom_key)
+        return ChannelInfo.from_dict(data) if data else None
+
+    def get_channels_by_provider(self, provider: str, include_keys: bool = True) -> List[ChannelInfo]:
+        """按提供商获取渠道列表（include_keys=False时密钥字段保持密文）"""
+        channels_data = db_manager.get_channels_by_provider(provider, include_keys)
         return [ChannelInfo.from_dict(data) for data in channels_data]
 
-    def get_all_channels(self) -> List[ChannelInfo]:
-        """获取所有渠道"""
-        channels_data = db_manager.get_all_channels()
+    def get_all_channels(self, include_keys: bool = True) -> List[ChannelInfo]:
+        """获取所有渠道（include_keys=False时密钥字段保持密文，仅用于展示/统计）"""
+        channels_data = db_manager.get_all_channels(include_keys)
         return [ChannelInfo.from_dict(data) for data in channels_data]
 
-    def get_enabled_channels(self) -> List[ChannelInfo]:
-        """获取所有启用的渠道"""
-        channels_data = db_manager.get_enabled_channels()
+    def get_enabled_channels(self, include_keys: bool = True) -> List[ChannelInfo]:
+        """获取所有启用的渠道（include_keys=False时密钥字段保持密文，仅用于展示/统计）"""
+        channels_data = db_manager.get_enabled_channels(include_keys)
         return [ChannelInfo.from_dict(data) for data in channels_data]
     
     
@@ -183,8 +190,8 @@ class ChannelManager:
     
     def get_channel_statistics(self) -> Dict[str, Any]:
         """获取渠道统计信息"""
-        all_channels = self.get_all_channels()
-        enabled_channels = self.get_enabled_channels()
+        all_channels = self.get_all_channels(include_keys=False)
+        enabled_channels = self.get_enabled_channels(include_keys=False)
 
         total_channels = len(all_channels)
         enabled_count = len(enabled_channels)
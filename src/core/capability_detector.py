@@ -4,7 +4,7 @@
 import asyncio
 import json
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 
@@ -269,12 +269,12 @@ class BaseCapabilityDetector(ABC):
         self, 
         method: str, 
         url: str, 
-        data: Optional[Dict[str, Any]] = None,
+        data: Optional[Union[Dict[str, Any], bytes]] = None,
         headers: Optional[Dict[str, str]] = None,
         timeout: int = 30,
         show_details: bool = False
     ) -> Tuple[int, Dict[str, Any]]:
-        """发送HTTP请求"""
+        """发送HTTP请求（data为bytes时视为已序列化的JSON请求体）"""
         default_headers = {
             "Content-Type": "application/json"
         }
@@ -293,14 +293,18 @@ class BaseCapabilityDetector(ABC):
             if self.config.proxy_username and self.config.proxy_password:
                 proxy_url += f"{self.config.proxy_username}:{self.config.proxy_password}@"
             proxy_url += f"{self.config.proxy_host}:{self.config.proxy_port}"
-            proxy_config = {"http://": proxy_url, "https://": proxy_url}
+            # 单个URL即对http/https请求都使用该代理
+            proxy_config = proxy_url
         
         try:
             async with httpx.AsyncClient(timeout=timeout, proxies=proxy_config) as client:
                 if method.upper() == "GET":
                     response = await client.get(url, headers=default_headers)
                 elif method.upper() == "POST":
-                    response = await client.post(url, json=data, headers=default_headers)
+                    if isinstance(data, bytes):
+                        response = await client.post(url, content=data, headers=default_headers)
+                    else:
+                        response = await client.post(url, json=data, headers=default_headers)
                 else:
                     raise ValueError(f"Unsupported HTTP method: {method}")
                 
@@ -344,7 +348,7 @@ class BaseCapabilityDetector(ABC):
         
         return "Unknown error"
     
-    def _show_request_details(self, method: str, url: str, data: Optional[Dict[str, Any]], headers: Dict[str, str]):
+    def _show_request_details(self, method: str, url: str, data: Optional[Union[Dict[str, Any], bytes]], headers: Dict[str, str]):
         """记录请求详情（仅在调试模式下）"""
         if not getattr(self, 'debug_mode', False):
             return
@@ -354,6 +358,9 @@ class BaseCapabilityDetector(ABC):
         self.logger.debug(f"HTTP Request: {method.upper()} {url}")
         if data:
             from src.utils.security import safe_log_request
+            if isinstance(data, bytes):
+                # 预序列化的请求体解码为JSON文本，按结构掩码后记录，而不是记录bytes的repr
+                data = data.decode()
             self.logger.debug(f"Request Body: {safe_log_request(data)}")
     
     def _show_response_details(self, status_code: int, data: Dict[str, Any], headers):
@@ -120,8 +120,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
         # 获取测试模型
         model = await self._get_test_model()
         
-        test_data = config.test_data.copy()
-        test_data["model"] = model
+        test_data = config.get_test_body(model)
         
         status_code, response_data = await self._make_request(
             "POST", url, data=test_data, headers=self.auth_headers, timeout=config.timeout
@@ -150,7 +149,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
             capability=config.name,
             status=CapabilityStatus.SUPPORTED,
             details={
-                "model": test_data["model"],
+                "model": model,
                 "response": message,
                 "usage": response_data.get("usage", {})
             },
@@ -164,8 +163,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
         # 获取测试模型
         model = await self._get_test_model()
 
-        test_data = config.test_data.copy()
-        test_data["model"] = model
+        test_data = config.get_test_body(model)
 
         try:
             import httpx
@@ -175,7 +173,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
 
             async with httpx.AsyncClient(timeout=config.timeout) as client:
                 async with client.stream(
-                    "POST", url, json=test_data, headers=self.auth_headers
+                    "POST", url, content=test_data, headers=self.auth_headers
                 ) as response:
                     if response.status_code != 200:
                         response_data = await response.aread()
@@ -246,7 +244,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
                         capability=config.name,
                         status=CapabilityStatus.SUPPORTED,
                         details={
-                            "model": test_data["model"],
+                            "model": model,
                             "chunks_received": len(chunks),
                             "content_chunks": len(content_chunks),
                             "full_content": full_content,
@@ -362,8 +360,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
         
         # 不再基于模型名称预判，直接尝试测试
         
-        test_data = config.test_data.copy()
-        test_data["model"] = model
+        test_data = config.get_test_body(model)
         
         status_code, response_data = await self._make_request(
             "POST", url, data=test_data, headers=self.auth_headers, timeout=config.timeout
@@ -399,7 +396,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
                 capability=config.name,
                 status=CapabilityStatus.SUPPORTED,
                 details={
-                    "model": test_data["model"],
+                    "model": model,
                     "tool_calls": message["tool_calls"],
                     "usage": response_data.get("usage", {}),
                     "note": "Successfully detected function calling capability"
@@ -412,7 +409,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
                 capability=config.name,
                 status=CapabilityStatus.UNKNOWN,
                 details={
-                    "model": test_data["model"],
+                    "model": model,
                     "message": message,
                     "note": "Model did not call function, may not support or chose not to use"
                 },
@@ -428,8 +425,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
         
         # 不再基于模型名称预判，直接尝试测试
         
-        test_data = config.test_data.copy()
-        test_data["model"] = model
+        test_data = config.get_test_body(model)
         
         status_code, response_data = await self._make_request(
             "POST", url, data=test_data, headers=self.auth_headers, timeout=config.timeout
@@ -473,7 +469,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
                 capability=config.name,
                 status=CapabilityStatus.SUPPORTED,
                 details={
-                    "model": test_data["model"],
+                    "model": model,
                     "structured_output": parsed_content,
                     "usage": response_data.get("usage", {})
                 },
@@ -492,8 +488,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
         
         # 不再基于模型名称预判，直接尝试测试
         
-        test_data = config.test_data.copy()
-        test_data["model"] = model
+        test_data = config.get_test_body(model)
         
         status_code, response_data = await self._make_request(
             "POST", url, data=test_data, headers=self.auth_headers, timeout=config.timeout
@@ -534,7 +529,7 @@ class OpenAICapabilityDetector(BaseCapabilityDetector):
             capability=config.name,
             status=CapabilityStatus.SUPPORTED if vision_detected else CapabilityStatus.UNKNOWN,
             details={
-                "model": test_data["model"],
+                "model": model,
                 "response": message["content"],
                 "vision_detected": vision_detected,
                 "expected_numbers": expected_numbers,
@@ -5,10 +5,35 @@ Anthropic格式转换器
 from typing import Dict, Any, Optional, List
 import json
 import copy
+import time
 
 from .base_converter import BaseConverter, ConversionResult, ConversionError
 from .anthropic_openai import anthropic_request_to_openai
 
+# 结束原因映射：(源格式, 目标格式) -> {源结束原因: Anthropic stop_reason}
+_FINISH_REASON_MAP = {
+    ("openai", "anthropic"): {
+        "stop": "end_turn",
+        "length": "max_tokens",
+        "content_filter": "stop_sequence",
+        "tool_calls": "tool_use"
+    },
+    ("gemini", "anthropic"): {
+        # 旧版本大写格式
+        "STOP": "end_turn",
+        "MAX_TOKENS": "max_tokens",
+        "SAFETY": "stop_sequence",
+        "RECITATION": "stop_sequence",
+        # 新版本小写格式（v1beta/v1 API）
+        "stop": "end_turn",
+        "length": "max_tokens",
+        "safety": "stop_sequence",
+        "recitation": "stop_sequence",
+        "other": "end_turn"
+    }
+}
+_NO_MAPPING: Dict[str, str] = {}
+
 # 全局工具状态管理器
 class ToolStateManager:
     _instance = None
@@ -422,8 +447,6 @@ class AnthropicConverter(BaseConverter):
     
     def _convert_from_openai_streaming_chunk(self, data: Dict[str, Any]) -> ConversionResult:
         """转换OpenAI流式响应chunk到Anthropic SSE格式 """
-        import json, time, random
-        
         # 首先验证原始模型名称，确保在状态初始化之前就检查
         if not self.original_model:
             raise ValueError("Original model name is required for streaming response conversion")
@@ -435,8 +458,11 @@ class AnthropicConverter(BaseConverter):
                 if hasattr(self, attr):
                     delattr(self, attr)
             
+            # 流开始时读取一次时间戳，整个流内复用
+            created_ms = int(time.time() * 1000)
             self._streaming_state = {
-                'message_id': f"msg_{int(time.time() * 1000)}",
+                'message_id': f"msg_{created_ms}",
+                'created': created_ms // 1000,
                 'model': self.original_model,  # 确保使用有效的模型名称
                 'has_started': False,
                 'has_text_content_started': False,
@@ -542,7 +568,7 @@ class AnthropicConverter(BaseConverter):
                     state['tool_call_index_to_content_block_index'][tool_call_index] = tool_content_block_index
                     
                     # 生成工具调用ID和名称
-                    tool_call_id = tool_call.get('id', f"call_{int(time.time())}_{tool_call_index}")
+                    tool_call_id = tool_call['id'] if 'id' in tool_call else f"call_{state['created']}_{tool_call_index}"
                     tool_call_name = tool_call.get('function', {}).get('name', f"tool_{tool_call_index}")
                     
                     # 开始新的tool_use content block
@@ -1173,36 +1199,7 @@ class AnthropicConverter(BaseConverter):
     
     def _map_finish_reason(self, reason: str, source_format: str, target_format: str) -> str:
         """映射结束原因"""
-        reason_mappings = {
-            "openai": {
-                "anthropic": {
-                    "stop": "end_turn",
-                    "length": "max_tokens",
-                    "content_filter": "stop_sequence",
-                    "tool_calls": "tool_use"
-                }
-            },
-            "gemini": {
-                "anthropic": {
-                    # 旧版本大写格式
-                    "STOP": "end_turn",
-                    "MAX_TOKENS": "max_tokens",
-                    "SAFETY": "stop_sequence",
-                    "RECITATION": "stop_sequence",
-                    # 新版本小写格式（v1beta/v1 API）
-                    "stop": "end_turn",
-                    "length": "max_tokens",
-                    "safety": "stop_sequence",
-                    "recitation": "stop_sequence",
-                    "other": "end_turn"
-                }
-            }
-        }
-        
-        try:
-            return reason_mappings[source_format][target_format].get(reason, "end_turn")
-        except KeyError:
-            return "end_turn"
+        return _FINISH_REASON_MAP.get((source_format, target_format), _NO_MAPPING).get(reason, "end_turn")
 
     def _sanitize_schema(self, schema: Dict[str, Any]) -> Dict[str, Any]:
         """递归移除Gemini不支持的JSON Schema关键字"""
@@ -8,6 +8,10 @@ import time
 from .base_converter import ConversionError
 from .reasoning_utils import determine_reasoning_effort
 
+# Reused compact encoder for tool_call arguments
+_COMPACT_JSON_ENCODE = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
 def anthropic_request_to_openai(converter, data: Dict[str, Any]) -> Dict[str, Any]:
     """Convert an Anthropic request to an OpenAI Chat Completions request."""
     result_data: Dict[str, Any] = {}
@@ -181,30 +185,31 @@ def anthropic_request_to_openai(converter, data: Dict[str, Any]) -> Dict[str, An
 
 def anthropic_response_to_openai(converter, data: Dict[str, Any]) -> Dict[str, Any]:
     """Convert an Anthropic response to an OpenAI Chat Completions response."""
-    if not getattr(converter, "original_model", None):
+    model = getattr(converter, "original_model", None)
+    if not model:
         raise ValueError("Original model name is required for response conversion")
 
     result_data = {
         "id": f"chatcmpl-{data.get('id', 'anthropic')}",
         "object": "chat.completion",
         "created": int(time.time()),
-        "model": converter.original_model,
+        "model": model,
         "choices": [],
         "usage": {},
     }
 
-    content = ""
+    content_parts = []
     tool_calls = []
-    thinking_content = ""
+    thinking_parts = []
 
     if "content" in data and isinstance(data["content"], list):
         for item in data["content"]:
             if item.get("type") == "text":
-                content += item.get("text", "")
+                content_parts.append(item.get("text", ""))
             elif item.get("type") == "thinking":
                 thinking_text = item.get("thinking", "")
                 if thinking_text.strip():
-                    thinking_content += thinking_text
+                    thinking_parts.append(thinking_text)
             elif item.get("type") == "tool_use":
                 tool_calls.append(
                     {
@@ -212,13 +217,13 @@ def anthropic_response_to_openai(converter, data: Dict[str, Any]) -> Dict[str, A
                         "type": "function",
                         "function": {
                             "name": item.get("name", ""),
-                            "arguments": json.dumps(
-                                item.get("input", {}), ensure_ascii=False
-                            ),
+                            "arguments": _COMPACT_JSON_ENCODE(item.get("input", {})),
                         },
                     }
                 )
 
+    content = "".join(content_parts)
+    thinking_content = "".join(thinking_parts)
     if thinking_content.strip():
         content = f"<thinking>\n{thinking_content.strip()}\n</thinking>\n\n{content}"
 
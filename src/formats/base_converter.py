@@ -3,7 +3,7 @@
 定义格式转换的基础接口和通用功能
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List
 from dataclasses import dataclass
 
 from src.utils.logger import setup_logger
@@ -21,9 +21,9 @@ class ConversionRequest:
     query_params: Optional[Dict[str, str]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversionResult:
-    """转换结果"""
+    """转换结果（流式转换每个chunk都会创建，使用__slots__避免实例字典）"""
     success: bool
     data: Optional[Dict[str, Any]] = None
     headers: Optional[Dict[str, str]] = None
@@ -84,6 +84,27 @@ class BaseConverter(ABC):
         
         return system_message, filtered_messages
     
+    def _convert_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        role_converters: Dict[str, Callable[[Dict[str, Any]], Any]],
+        default_converter: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> tuple[Optional[str], List[Any]]:
+        """单次遍历提取系统消息并按角色转换其余消息（无对应转换方法的角色被跳过）"""
+        system_message = None
+        converted = []
+        
+        for message in messages:
+            role = message.get("role")
+            if role == "system":
+                system_message = message.get("content", "")
+                continue
+            convert = role_converters.get(role, default_converter)
+            if convert is not None:
+                converted.append(convert(message))
+        
+        return system_message, converted
+    
     def _create_system_message(self, content: str) -> Dict[str, Any]:
         """创建系统消息"""
         return {
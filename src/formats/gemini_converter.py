@@ -9,6 +9,28 @@ import copy
 from .base_converter import BaseConverter, ConversionResult, ConversionError
 from .reasoning_utils import determine_reasoning_effort
 
+# JSON Schema中需要整数值的字段（Gemini可能以字符串形式传入）
+_INT_FIELDS = frozenset({"minItems", "maxItems", "minimum", "maximum", "minLength", "maxLength"})
+# convert_types递归时跳过的标量字段
+_SCALAR_FIELDS = _INT_FIELDS | {"type"}
+
+# 结束原因映射：(源格式, 目标格式) -> {源结束原因: Gemini finishReason}
+_FINISH_REASON_MAP = {
+    ("openai", "gemini"): {
+        "stop": "STOP",
+        "length": "MAX_TOKENS",
+        "content_filter": "SAFETY",
+        "tool_calls": "MODEL_REQUESTED_TOOL"
+    },
+    ("anthropic", "gemini"): {
+        "end_turn": "STOP",
+        "max_tokens": "MAX_TOKENS",
+        "stop_sequence": "STOP",
+        "tool_use": "STOP"
+    }
+}
+_NO_MAPPING: Dict[str, str] = {}
+
 
 class GeminiConverter(BaseConverter):
     """Gemini格式转换器"""
@@ -1149,15 +1171,15 @@ class GeminiConverter(BaseConverter):
                 if "type" in obj and isinstance(obj["type"], str):
                     obj["type"] = type_mapping.get(obj["type"].upper(), obj["type"].lower())
                 
-                # 转换需要整数值的字段（将字符串转换为整数）
-                integer_fields = ["minItems", "maxItems", "minimum", "maximum", "minLength", "maxLength"]
-                for field in integer_fields:
-                    if field in obj and isinstance(obj[field], str) and obj[field].isdigit():
-                        obj[field] = int(obj[field])
+                # 转换需要整数值的字段（将字符串转换为整数），只遍历实际存在的字段
+                for field in _INT_FIELDS & obj.keys():
+                    value = obj[field]
+                    if isinstance(value, str) and value.isdigit():
+                        obj[field] = int(value)
                 
                 # 递归处理所有字段（跳过已经处理过的标量字段）
                 for key, value in obj.items():
-                    if key not in ["type"] + integer_fields:  # 避免重复处理已转换的字段
+                    if key not in _SCALAR_FIELDS:  # 避免重复处理已转换的字段
                         obj[key] = convert_types(value)
                     
             elif isinstance(obj, list):
@@ -1222,15 +1244,15 @@ class GeminiConverter(BaseConverter):
                 if "type" in obj and isinstance(obj["type"], str):
                     obj["type"] = type_mapping.get(obj["type"].upper(), obj["type"].lower())
                 
-                # 转换需要整数值的字段（将字符串转换为整数）
-                integer_fields = ["minItems", "maxItems", "minimum", "maximum", "minLength", "maxLength"]
-                for field in integer_fields:
-                    if field in obj and isinstance(obj[field], str) and obj[field].isdigit():
-                        obj[field] = int(obj[field])
+                # 转换需要整数值的字段（将字符串转换为整数），只遍历实际存在的字段
+                for field in _INT_FIELDS & obj.keys():
+                    value = obj[field]
+                    if isinstance(value, str) and value.isdigit():
+                        obj[field] = int(value)
                 
                 # 递归处理所有字段（跳过已经处理过的标量字段）
                 for key, value in obj.items():
-                    if key not in ["type"] + integer_fields:  # 避免重复处理已转换的字段
+                    if key not in _SCALAR_FIELDS:  # 避免重复处理已转换的字段
                         obj[key] = convert_types(value)
                     
             elif isinstance(obj, list):
@@ -1243,26 +1265,4 @@ class GeminiConverter(BaseConverter):
 
     def _map_finish_reason(self, reason: str, source_format: str, target_format: str) -> str:
         """映射结束原因"""
-        reason_mappings = {
-            "openai": {
-                "gemini": {
-                    "stop": "STOP",
-                    "length": "MAX_TOKENS",
-                    "content_filter": "SAFETY",
-                    "tool_calls": "MODEL_REQUESTED_TOOL"
-                }
-            },
-            "anthropic": {
-                "gemini": {
-                    "end_turn": "STOP",
-                    "max_tokens": "MAX_TOKENS",
-                    "stop_sequence": "STOP",
-                    "tool_use": "STOP"
-                }
-            }
-        }
-        
-        try:
-            return reason_mappings[source_format][target_format].get(reason, "STOP")
-        except KeyError:
-            return "STOP"
+        return _FINISH_REASON_MAP.get((source_format, target_format), _NO_MAPPING).get(reason, "STOP")
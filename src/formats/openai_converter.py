@@ -2,13 +2,164 @@
 OpenAI格式转换器
 处理OpenAI API格式与其他格式之间的转换
 """
-from typing import Dict, Any, Optional, List
+from collections import deque
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 import json
-import copy
+import os
+import re
+import time
 
 from .base_converter import BaseConverter, ConversionResult, ConversionError
 from .anthropic_openai import anthropic_response_to_openai
 
+# 复用同一个紧凑JSON编码器序列化tool_call arguments
+_COMPACT_JSON_ENCODE = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _new_stream_id() -> str:
+    """生成29位的随机ID（用于chatcmpl-前缀）"""
+    return os.urandom(16).hex()[:29]
+
+
+# reasoning_effort -> 思考预算token数的环境变量
+_REASONING_EFFORT_TO_ANTHROPIC_ENV = {
+    "low": "OPENAI_LOW_TO_ANTHROPIC_TOKENS",
+    "medium": "OPENAI_MEDIUM_TO_ANTHROPIC_TOKENS",
+    "high": "OPENAI_HIGH_TO_ANTHROPIC_TOKENS",
+}
+_REASONING_EFFORT_TO_GEMINI_ENV = {
+    "low": "OPENAI_LOW_TO_GEMINI_TOKENS",
+    "medium": "OPENAI_MEDIUM_TO_GEMINI_TOKENS",
+    "high": "OPENAI_HIGH_TO_GEMINI_TOKENS",
+}
+
+def _parse_tool_arguments(arguments: Any) -> Any:
+    """解析tool_call的arguments：已是字典时直接使用，空参数不解析，解析失败返回空对象"""
+    if isinstance(arguments, dict):
+        return arguments
+    if not arguments or arguments == "{}" or arguments == "{ }":
+        return {}
+    try:
+        # OpenAI 规定 arguments 为 JSON 字符串
+        return json.loads(arguments)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+def _parse_data_url(url: str) -> Optional[Tuple[str, str]]:
+    """解析base64 data URL，返回 (media_type, data)，不是合法的base64 data URL时返回None"""
+    head, sep, data = url.partition(";base64,")
+    if not sep or not head.startswith("data:"):
+        return None
+    return head[5:], data
+
+
+def _build_delta(content: str, tool_calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """以单个字典字面量构建流式chunk的delta（只包含非空字段）"""
+    if tool_calls:
+        if content:
+            return {"content": content, "tool_calls": tool_calls}
+        return {"tool_calls": tool_calls}
+    return {"content": content} if content else {}
+
+
+# 结束原因映射（常用方向直接查表）
+_ANTHROPIC_TO_OPENAI_FINISH = {
+    "end_turn": "stop",
+    "max_tokens": "length",
+    "stop_sequence": "stop",
+    "tool_use": "tool_calls"
+}
+_GEMINI_TO_OPENAI_FINISH = {
+    "STOP": "stop",
+    "MAX_TOKENS": "length",
+    "SAFETY": "content_filter",
+    "RECITATION": "content_filter"
+}
+_FINISH_REASON_MAP = {
+    ("anthropic", "openai"): _ANTHROPIC_TO_OPENAI_FINISH,
+    ("gemini", "openai"): _GEMINI_TO_OPENAI_FINISH,
+}
+_NO_MAPPING: Dict[str, str] = {}
+
+# OpenAI tool_call id格式: call_<name>_<hash>
+_CALL_ID_RE = re.compile(r"call_(.+)_[^_]*")
+
+# <thinking>...</thinking> 标签
+_THINKING_OPEN = "<thinking>"
+_THINKING_CLOSE = "</thinking>"
+
+# SSE事件中的 event:/data: 行
+_SSE_FIELD_RE = re.compile(r"^(event|data): (.*)$", re.MULTILINE)
+
+# Gemini支持的JSON Schema关键字
+_GEMINI_SCHEMA_KEYS = frozenset({"type", "description", "properties", "required", "enum", "items"})
+
+
+def _iter_thinking_blocks(text: str) -> Iterator[Dict[str, Any]]:
+    """按顺序产出文本中的text/thinking content block（去除首尾空白），无有效内容时产出原文本块"""
+    emitted = False
+    last_end = 0
+    
+    # 标签是固定字面量，直接用str.find定位，无需正则
+    while True:
+        start = text.find(_THINKING_OPEN, last_end)
+        if start < 0:
+            break
+        end = text.find(_THINKING_CLOSE, start + len(_THINKING_OPEN))
+        if end < 0:
+            break
+        
+        # thinking标签之前的文本（如果有）
+        before_text = text[last_end:start].strip()
+        if before_text:
+            emitted = True
+            yield {"type": "text", "text": before_text}
+        
+        thinking_text = text[start + len(_THINKING_OPEN):end].strip()
+        if thinking_text:
+            emitted = True
+            yield {"type": "thinking", "thinking": thinking_text}
+        
+        last_end = end + len(_THINKING_CLOSE)
+    
+    # 最后一个thinking标签之后的文本（如果有）
+    after_text = text[last_end:].strip()
+    if after_text:
+        yield {"type": "text", "text": after_text}
+    elif not emitted:
+        yield {"type": "text", "text": text}
+
+
+def _sanitize_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """移除Gemini不支持的JSON Schema关键字（使用显式栈迭代处理嵌套的properties/items）"""
+    if not isinstance(schema, dict):
+        return schema
+
+    allowed_keys = _GEMINI_SCHEMA_KEYS
+    sanitized: Dict[str, Any] = {}
+    stack = deque([(schema, sanitized)])
+    while stack:
+        src, dst = stack.pop()
+        for key, value in src.items():
+            if key not in allowed_keys:
+                continue
+            if key == "properties" and isinstance(value, dict):
+                props = dst[key] = {}
+                for prop_name, prop_schema in value.items():
+                    if isinstance(prop_schema, dict):
+                        child = props[prop_name] = {}
+                        stack.append((prop_schema, child))
+                    else:
+                        props[prop_name] = prop_schema
+            elif key == "items" and isinstance(value, dict):
+                child = dst[key] = {}
+                stack.append((value, child))
+            else:
+                dst[key] = value
+
+    return sanitized
+
 
 class OpenAIConverter(BaseConverter):
     """OpenAI格式转换器"""
@@ -16,6 +167,38 @@ class OpenAIConverter(BaseConverter):
     def __init__(self):
         super().__init__()
         self.original_model = None
+        self._stream_id = None
+        self._stream_created = None
+        self._tool_call_counter = 0
+        # Anthropic流式工具调用状态：content block index -> {id, name, arguments}
+        self._anthropic_tool_state = {}
+        # 目标/源格式 -> 转换方法
+        self._request_converters = {
+            "anthropic": self._convert_to_anthropic_request,
+            "gemini": self._convert_to_gemini_request,
+        }
+        self._response_converters = {
+            "anthropic": self._convert_from_anthropic_response,
+            "gemini": self._convert_from_gemini_response,
+        }
+        # 消息角色 -> 单条消息转换方法
+        self._anthropic_role_converters = {
+            "user": self._user_to_anthropic,
+            "assistant": self._assistant_to_anthropic,
+            "tool": self._tool_to_anthropic,
+        }
+        self._gemini_role_converters = {
+            "user": self._user_to_gemini,
+            "assistant": self._assistant_to_gemini,
+            "tool": self._tool_to_gemini,
+        }
+        # Anthropic流式事件类型 -> 处理方法
+        self._anthropic_stream_handlers = {
+            "content_block_start": self._anthropic_block_start,
+            "content_block_delta": self._anthropic_block_delta,
+            "message_delta": self._anthropic_message_delta,
+            "message_stop": self._anthropic_message_stop,
+        }
     
     def set_original_model(self, model: str):
         """设置原始模型名称"""
@@ -27,6 +210,15 @@ class OpenAIConverter(BaseConverter):
         for attr in streaming_attrs:
             if hasattr(self, attr):
                 delattr(self, attr)
+        self._stream_id = None
+        self._stream_created = None
+        self._tool_call_counter = 0
+        self._anthropic_tool_state.clear()
+    
+    def _start_stream(self):
+        """流开始时生成chunk id和created时间戳，整个流内保持一致，避免每个chunk重复计算"""
+        self._stream_id = f"chatcmpl-{_new_stream_id()}"
+        self._stream_created = int(time.time())
     
     def get_supported_formats(self) -> List[str]:
         """获取支持的格式列表"""
@@ -43,15 +235,13 @@ class OpenAIConverter(BaseConverter):
             if target_format == "openai":
                 # OpenAI到OpenAI，格式与渠道相同，不需要转换思考参数
                 return ConversionResult(success=True, data=data)
-            elif target_format == "anthropic":
-                return self._convert_to_anthropic_request(data)
-            elif target_format == "gemini":
-                return self._convert_to_gemini_request(data)
-            else:
+            converter = self._request_converters.get(target_format)
+            if converter is None:
                 return ConversionResult(
                     success=False,
                     error=f"Unsupported target format: {target_format}"
                 )
+            return converter(data)
         except Exception as e:
             self.logger.error(f"Failed to convert OpenAI request to {target_format}: {e}")
             return ConversionResult(success=False, error=str(e))
@@ -66,15 +256,13 @@ class OpenAIConverter(BaseConverter):
         try:
             if source_format == "openai":
                 return ConversionResult(success=True, data=data)
-            elif source_format == "anthropic":
-                return self._convert_from_anthropic_response(data)
-            elif source_format == "gemini":
-                return self._convert_from_gemini_response(data)
-            else:
+            converter = self._response_converters.get(source_format)
+            if converter is None:
                 return ConversionResult(
                     success=False,
                     error=f"Unsupported source format: {source_format}"
                 )
+            return converter(data)
         except Exception as e:
             self.logger.error(f"Failed to convert {source_format} response to OpenAI: {e}")
             return ConversionResult(success=False, error=str(e))
@@ -90,72 +278,14 @@ class OpenAIConverter(BaseConverter):
         
         # 处理消息和系统消息
         if "messages" in data:
-            system_message, filtered_messages = self._extract_system_message(data["messages"])
+            # 单次遍历：提取系统消息并按角色转换消息格式（未知角色直接跳过）
+            system_message, anthropic_messages = self._convert_messages(
+                data["messages"], self._anthropic_role_converters
+            )
             
             if system_message:
                 result_data["system"] = system_message
             
-            # 转换消息格式
-            anthropic_messages = []
-            for msg in filtered_messages:
-                role = msg.get("role")
-                
-                if role == "user":
-                    # 用户消息，正常转换内容
-                    anthropic_messages.append({
-                        "role": "user",
-                        "content": self._convert_content_to_anthropic(msg.get("content", ""))
-                    })
-                    
-                elif role == "assistant":
-                    # 助手消息，检查是否包含tool_calls
-                    if msg.get("tool_calls"):
-                        # 转换tool_calls为tool_use content blocks
-                        content_blocks = []
-                        for tc in msg["tool_calls"]:
-                            if tc and tc.get("type") == "function" and "function" in tc:
-                                func = tc["function"]
-                                # 解析arguments JSON字符串
-                                args_str = func.get("arguments", "{}")
-                                try:
-                                    args_obj = json.loads(args_str) if args_str else {}
-                                except json.JSONDecodeError:
-                                    args_obj = {}
-                                
-                                content_blocks.append({
-                                    "type": "tool_use",
-                                    "id": tc.get("id", ""),
-                                    "name": func.get("name", ""),
-                                    "input": args_obj
-                                })
-                        
-                        anthropic_messages.append({
-                            "role": "assistant",
-                            "content": content_blocks
-                        })
-                    else:
-                        # 普通助手消息
-                        anthropic_messages.append({
-                            "role": "assistant",
-                            "content": self._convert_content_to_anthropic(msg.get("content", ""))
-                        })
-                        
-                elif role == "tool":
-                    # 工具消息，转换为用户消息中的tool_result
-                    tool_call_id = msg.get("tool_call_id", "")
-                    content = str(msg.get("content", ""))
-                    
-                    anthropic_messages.append({
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "tool_result",
-                                "tool_use_id": tool_call_id,
-                                "content": content
-                            }
-                        ]
-                    })
-            
             result_data["messages"] = anthropic_messages
         
         # 处理其他参数
@@ -168,7 +298,6 @@ class OpenAIConverter(BaseConverter):
             result_data["max_tokens"] = data["max_tokens"]
         else:
             # 优先级2：检查环境变量ANTHROPIC_MAX_TOKENS
-            import os
             env_max_tokens = os.environ.get("ANTHROPIC_MAX_TOKENS")
             if env_max_tokens:
                 try:
@@ -194,15 +323,20 @@ class OpenAIConverter(BaseConverter):
         
         # 处理工具调用
         if "tools" in data:
-            anthropic_tools = []
-            for tool in data["tools"]:
+            # 预分配结果列表，最后截掉非function类型工具留下的空位
+            raw_tools = data["tools"]
+            anthropic_tools = [None] * len(raw_tools)
+            count = 0
+            for tool in raw_tools:
                 if tool.get("type") == "function" and "function" in tool:
                     func = tool["function"]
-                    anthropic_tools.append({
+                    anthropic_tools[count] = {
                         "name": func.get("name", ""),
                         "description": func.get("description", ""),
                         "input_schema": func.get("parameters", {})
-                    })
+                    }
+                    count += 1
+            del anthropic_tools[count:]
             result_data["tools"] = anthropic_tools
         
         # 处理思考预算转换 (OpenAI max_completion_tokens + reasoning_effort -> Anthropic thinkingBudget)
@@ -218,19 +352,9 @@ class OpenAIConverter(BaseConverter):
                 self.logger.info(f"🧠 [THINKING BUDGET] 使用指定的reasoning_effort参数: '{reasoning_effort}'")
             
             # 根据环境变量映射reasoning_effort到具体的token数值
-            import os
             thinking_budget = None
-            env_key = None
-            
-            if reasoning_effort == "low":
-                env_key = "OPENAI_LOW_TO_ANTHROPIC_TOKENS"
-                env_value = os.environ.get(env_key)
-            elif reasoning_effort == "medium":
-                env_key = "OPENAI_MEDIUM_TO_ANTHROPIC_TOKENS"
-                env_value = os.environ.get(env_key)
-            elif reasoning_effort == "high":
-                env_key = "OPENAI_HIGH_TO_ANTHROPIC_TOKENS"
-                env_value = os.environ.get(env_key)
+            env_key = _REASONING_EFFORT_TO_ANTHROPIC_ENV.get(reasoning_effort)
+            env_value = os.environ.get(env_key) if env_key else None
             
             self.logger.info(f"🔍 [THINKING BUDGET] 查找环境变量: {env_key}")
             
@@ -257,6 +381,53 @@ class OpenAIConverter(BaseConverter):
         
         return ConversionResult(success=True, data=result_data)
     
+    def _user_to_anthropic(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """用户消息，正常转换内容"""
+        return {
+            "role": "user",
+            "content": self._convert_content_to_anthropic(msg.get("content", ""))
+        }
+    
+    def _assistant_to_anthropic(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """助手消息，tool_calls转换为tool_use content blocks"""
+        tool_calls = msg.get("tool_calls")
+        if not tool_calls:
+            # 普通助手消息
+            return {
+                "role": "assistant",
+                "content": self._convert_content_to_anthropic(msg.get("content", ""))
+            }
+        
+        content_blocks = []
+        for tc in tool_calls:
+            if tc and tc.get("type") == "function" and "function" in tc:
+                func = tc["function"]
+                # 解析arguments JSON字符串
+                content_blocks.append({
+                    "type": "tool_use",
+                    "id": tc.get("id", ""),
+                    "name": func.get("name", ""),
+                    "input": _parse_tool_arguments(func.get("arguments", "{}"))
+                })
+        
+        return {
+            "role": "assistant",
+            "content": content_blocks
+        }
+    
+    def _tool_to_anthropic(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """工具消息，转换为用户消息中的tool_result"""
+        return {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": msg.get("tool_call_id", ""),
+                    "content": str(msg.get("content", ""))
+                }
+            ]
+        }
+    
     def _convert_to_gemini_request(self, data: Dict[str, Any]) -> ConversionResult:
         """转换OpenAI请求到Gemini格式"""
         result_data = {}
@@ -264,30 +435,12 @@ class OpenAIConverter(BaseConverter):
         if "model" in data:
             result_data["model"] = data["model"]
 
-        def _sanitize_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
-            """递归移除Gemini不支持的JSON Schema关键字"""
-            if not isinstance(schema, dict):
-                return schema
-
-            allowed_keys = {"type", "description", "properties", "required", "enum", "items"}
-            sanitized = {k: v for k, v in schema.items() if k in allowed_keys}
-
-            # 递归处理子属性
-            if "properties" in sanitized and isinstance(sanitized["properties"], dict):
-                sanitized["properties"] = {
-                    prop_name: _sanitize_schema(prop_schema)
-                    for prop_name, prop_schema in sanitized["properties"].items()
-                }
-
-            # 处理 items
-            if "items" in sanitized:
-                sanitized["items"] = _sanitize_schema(sanitized["items"])
-
-            return sanitized
-        
         # 处理消息和系统消息
         if "messages" in data:
-            system_message, filtered_messages = self._extract_system_message(data["messages"])
+            # 单次遍历：提取系统消息并按角色转换消息格式（其余角色按助手文本处理）
+            system_message, gemini_contents = self._convert_messages(
+                data["messages"], self._gemini_role_converters, self._model_text_to_gemini
+            )
             
             if system_message:
                 # 确保系统指令格式正确
@@ -297,71 +450,6 @@ class OpenAIConverter(BaseConverter):
                         "parts": [{"text": system_content}]
                     }
             
-            # 转换消息格式
-            gemini_contents = []
-            for msg in filtered_messages:
-                msg_role = msg.get("role")
-
-                # 1) 普通 user 消息
-                if msg_role == "user":
-                    gemini_contents.append({
-                        "role": "user",
-                        "parts": self._convert_content_to_gemini(msg.get("content", ""))
-                    })
-
-                # 2) assistant 带 tool_calls（functionCall）
-                elif msg_role == "assistant" and msg.get("tool_calls"):
-                    parts = []
-                    for tc in msg["tool_calls"]:
-                        if tc and "function" in tc:
-                            fn_name = tc["function"].get("name")
-                            # OpenAI 规定 arguments 为 JSON 字符串
-                            arg_str = tc["function"].get("arguments", "{}")
-                        else:
-                            continue
-                        try:
-                            arg_obj = json.loads(arg_str) if isinstance(arg_str, str) else arg_str
-                        except Exception:
-                            arg_obj = {}
-                        parts.append({
-                            "functionCall": {
-                                "name": fn_name,
-                                "args": arg_obj
-                            }
-                        })
-                    gemini_contents.append({
-                        "role": "model",
-                        "parts": parts if parts else [{"text": ""}]
-                    })
-
-                # 3) tool 结果 -> functionResponse
-                elif msg_role == "tool":
-                    tool_call_id = msg.get("tool_call_id", "")
-                    # 从 call_<name>_<hash> 提取 name
-                    fn_name = ""
-                    if tool_call_id.startswith("call_"):
-                        fn_name = "_".join(tool_call_id.split("_")[1:-1])  # 保留中间含下划线的函数名
-                    response_content = msg.get("content")
-                    # Gemini 要求 response 为对象
-                    if not isinstance(response_content, dict):
-                        response_content = {"content": response_content}
-                    gemini_contents.append({
-                        "role": "tool",
-                        "parts": [{
-                            "functionResponse": {
-                                "name": fn_name,
-                                "response": response_content
-                            }
-                        }]
-                    })
-
-                # 4) assistant 普通文本
-                else:
-                    gemini_contents.append({
-                        "role": "model",
-                        "parts": self._convert_content_to_gemini(msg.get("content", ""))
-                    })
-            
             result_data["contents"] = gemini_contents
         
         # 处理生成配置
@@ -378,7 +466,6 @@ class OpenAIConverter(BaseConverter):
             generation_config["maxOutputTokens"] = data["max_tokens"]
         else:
             # 如果客户端没有传max_tokens，检查环境变量ANTHROPIC_MAX_TOKENS
-            import os
             env_max_tokens = os.environ.get("ANTHROPIC_MAX_TOKENS")
             if env_max_tokens:
                 try:
@@ -397,15 +484,20 @@ class OpenAIConverter(BaseConverter):
         
         # 处理工具调用
         if "tools" in data:
-            function_declarations = []
-            for tool in data["tools"]:
+            # 预分配结果列表，最后截掉非function类型工具留下的空位
+            raw_tools = data["tools"]
+            function_declarations = [None] * len(raw_tools)
+            count = 0
+            for tool in raw_tools:
                 if tool.get("type") == "function" and "function" in tool:
                     func = tool["function"]
-                    function_declarations.append({
+                    function_declarations[count] = {
                         "name": func.get("name", ""),
                         "description": func.get("description", ""),
                         "parameters": _sanitize_schema(func.get("parameters", {}))
-                    })
+                    }
+                    count += 1
+            del function_declarations[count:]
             
             if function_declarations:
                 # Gemini官方规范使用 camelCase: functionDeclarations
@@ -433,19 +525,9 @@ class OpenAIConverter(BaseConverter):
                 self.logger.info(f"🧠 [THINKING BUDGET] 使用指定的reasoning_effort参数: '{reasoning_effort}'")
             
             # 根据环境变量映射reasoning_effort到具体的token数值
-            import os
             thinking_budget = None
-            env_key = None
-            
-            if reasoning_effort == "low":
-                env_key = "OPENAI_LOW_TO_GEMINI_TOKENS"
-                env_value = os.environ.get(env_key)
-            elif reasoning_effort == "medium":
-                env_key = "OPENAI_MEDIUM_TO_GEMINI_TOKENS"
-                env_value = os.environ.get(env_key)
-            elif reasoning_effort == "high":
-                env_key = "OPENAI_HIGH_TO_GEMINI_TOKENS"
-                env_value = os.environ.get(env_key)
+            env_key = _REASONING_EFFORT_TO_GEMINI_ENV.get(reasoning_effort)
+            env_value = os.environ.get(env_key) if env_key else None
             
             self.logger.info(f"🔍 [THINKING BUDGET] 查找环境变量: {env_key}")
             
@@ -472,6 +554,62 @@ class OpenAIConverter(BaseConverter):
         
         return ConversionResult(success=True, data=result_data)
     
+    def _user_to_gemini(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """普通 user 消息"""
+        return {
+            "role": "user",
+            "parts": self._convert_content_to_gemini(msg.get("content", ""))
+        }
+    
+    def _assistant_to_gemini(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """assistant 消息，带 tool_calls 时转换为 functionCall"""
+        tool_calls = msg.get("tool_calls")
+        if not tool_calls:
+            return self._model_text_to_gemini(msg)
+        
+        parts = []
+        for tc in tool_calls:
+            if not tc or "function" not in tc:
+                continue
+            func = tc["function"]
+            parts.append({
+                "functionCall": {
+                    "name": func.get("name"),
+                    "args": _parse_tool_arguments(func.get("arguments", "{}"))
+                }
+            })
+        return {
+            "role": "model",
+            "parts": parts if parts else [{"text": ""}]
+        }
+    
+    def _tool_to_gemini(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """tool 结果 -> functionResponse"""
+        tool_call_id = msg.get("tool_call_id", "")
+        # 从 call_<name>_<hash> 提取 name（保留中间含下划线的函数名）
+        match = _CALL_ID_RE.fullmatch(tool_call_id)
+        fn_name = match.group(1) if match else ""
+        response_content = msg.get("content")
+        # Gemini 要求 response 为对象
+        if not isinstance(response_content, dict):
+            response_content = {"content": response_content}
+        return {
+            "role": "tool",
+            "parts": [{
+                "functionResponse": {
+                    "name": fn_name,
+                    "response": response_content
+                }
+            }]
+        }
+    
+    def _model_text_to_gemini(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """assistant 普通文本"""
+        return {
+            "role": "model",
+            "parts": self._convert_content_to_gemini(msg.get("content", ""))
+        }
+    
     def _convert_from_anthropic_response(self, data: Dict[str, Any]) -> ConversionResult:
         """转换Anthropic响应到OpenAI格式"""
         try:
@@ -483,20 +621,18 @@ class OpenAIConverter(BaseConverter):
     
     def _convert_from_gemini_response(self, data: Dict[str, Any]) -> ConversionResult:
         """转换Gemini响应到OpenAI格式"""
-        import time
-        import random
-        import string
         # 生成类似OpenAI的ID格式
-        random_id = ''.join(random.choices(string.ascii_letters + string.digits, k=29))
+        random_id = _new_stream_id()
         # 必须有原始模型名称，否则报错
-        if not self.original_model:
+        model = self.original_model
+        if not model:
             raise ValueError("Original model name is required for response conversion")
             
         result_data = {
             "id": f"chatcmpl-{random_id}",
             "object": "chat.completion",
             "created": int(time.time()),  # 使用当前时间戳
-            "model": self.original_model,  # 必须使用原始模型名称
+            "model": model,  # 必须使用原始模型名称
             "usage": {},
             "choices": []
         }
@@ -505,27 +641,27 @@ class OpenAIConverter(BaseConverter):
         if "candidates" in data and data["candidates"] and data["candidates"][0]:
             candidate = data["candidates"][0]
 
-            content_text = ""
+            text_parts = []
             tool_calls = []
 
             if "content" in candidate and "parts" in candidate["content"]:
                 for part in candidate["content"]["parts"]:
                     # 普通文本
                     if "text" in part:
-                        content_text += part["text"]
+                        text_parts.append(part["text"])
                     # 函数调用
                     elif "functionCall" in part:
                         fc = part["functionCall"]
                         fc_name = fc.get("name", "")
                         fc_args = fc.get("args", {})
                         # 生成 tool_call id，遵循 "call_<name>_<hash>" 规则
-                        random_hash = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
+                        random_hash = os.urandom(4).hex()
                         tool_calls.append({
                             "id": f"call_{fc_name}_{random_hash}",
                             "type": "function",
                             "function": {
                                 "name": fc_name,
-                                "arguments": json.dumps(fc_args, ensure_ascii=False)
+                                "arguments": _COMPACT_JSON_ENCODE(fc_args)
                             }
                         })
 
@@ -540,9 +676,9 @@ class OpenAIConverter(BaseConverter):
             else:
                 message_dict = {
                     "role": "assistant",
-                    "content": content_text
+                    "content": "".join(text_parts)
                 }
-                finish_reason_val = self._map_finish_reason(candidate.get("finishReason", ""), "gemini", "openai")
+                finish_reason_val = _GEMINI_TO_OPENAI_FINISH.get(candidate.get("finishReason", ""), "stop")
 
             result_data["choices"] = [{
                 "message": message_dict,
@@ -563,25 +699,26 @@ class OpenAIConverter(BaseConverter):
     
     def _convert_from_gemini_streaming_chunk(self, data: Dict[str, Any]) -> ConversionResult:
         """转换Gemini流式响应chunk到OpenAI格式"""
-        import time
-        import random
-        import string
         
         # 生成一致的随机ID（在同一次对话中保持一致）
-        if not hasattr(self, '_stream_id'):
-            self._stream_id = ''.join(random.choices(string.ascii_letters + string.digits, k=29))
+        if self._stream_id is None:
+            self._start_stream()
+        
+        model = self.original_model
+        if not model:
+            raise ValueError("Model name is required for streaming response")
         
         # 检查是否是完整的流式响应结束
         if "candidates" in data and data["candidates"] and data["candidates"][0] and data["candidates"][0].get("finishReason"):
             # 这是最后的chunk，包含finishReason
             # 提取内容（Gemini 最后一个 chunk 仍可能带文本或工具调用）
-            final_content = ""
+            text_parts = []
             tool_calls = []
             candidate = data["candidates"][0]
             if "content" in candidate and candidate["content"].get("parts"):
                 for part in candidate["content"]["parts"]:
                     if "text" in part:
-                        final_content += part["text"]
+                        text_parts.append(part["text"])
                     elif "functionCall" in part:
                         # 处理工具调用
                         fc = part["functionCall"]
@@ -589,8 +726,6 @@ class OpenAIConverter(BaseConverter):
                         fc_args = fc.get("args", {})
                         
                         # 生成 tool_call id
-                        if not hasattr(self, '_tool_call_counter'):
-                            self._tool_call_counter = 0
                         self._tool_call_counter += 1
                         
                         tool_calls.append({
@@ -598,32 +733,25 @@ class OpenAIConverter(BaseConverter):
                             "type": "function",
                             "function": {
                                 "name": fc_name,
-                                "arguments": json.dumps(fc_args, ensure_ascii=False)
+                                "arguments": _COMPACT_JSON_ENCODE(fc_args)
                             }
                         })
             
-            if not self.original_model:
-                raise ValueError("Model name is required for streaming response")
-            
             # 构建delta内容
-            delta = {}
-            if final_content:
-                delta["content"] = final_content
-            if tool_calls:
-                delta["tool_calls"] = tool_calls
+            delta = _build_delta("".join(text_parts), tool_calls)
             
             # 确定finish_reason - 如果有工具调用，应该是tool_calls
             finish_reason = data["candidates"][0].get("finishReason", "")
             if tool_calls:
                 mapped_finish_reason = "tool_calls"
             else:
-                mapped_finish_reason = self._map_finish_reason(finish_reason, "gemini", "openai")
+                mapped_finish_reason = _GEMINI_TO_OPENAI_FINISH.get(finish_reason, "stop")
             
             result_data = {
-                "id": f"chatcmpl-{self._stream_id}",
+                "id": self._stream_id,
                 "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": self.original_model,
+                "created": self._stream_created,
+                "model": model,
                 "choices": [{
                     "index": 0,
                     "delta": delta,
@@ -645,13 +773,13 @@ class OpenAIConverter(BaseConverter):
         # 检查是否有增量内容
         elif "candidates" in data and data["candidates"] and data["candidates"][0]:
             candidate = data["candidates"][0]
-            content = ""
+            text_parts = []
             tool_calls = []
             
             if "content" in candidate and "parts" in candidate["content"]:
                 for part in candidate["content"]["parts"]:
                     if "text" in part:
-                        content += part["text"]
+                        text_parts.append(part["text"])
                     elif "functionCall" in part:
                         # 处理工具调用
                         fc = part["functionCall"]
@@ -659,8 +787,6 @@ class OpenAIConverter(BaseConverter):
                         fc_args = fc.get("args", {})
                         
                         # 生成 tool_call id
-                        if not hasattr(self, '_tool_call_counter'):
-                            self._tool_call_counter = 0
                         self._tool_call_counter += 1
                         
                         tool_calls.append({
@@ -668,26 +794,19 @@ class OpenAIConverter(BaseConverter):
                             "type": "function",
                             "function": {
                                 "name": fc_name,
-                                "arguments": json.dumps(fc_args, ensure_ascii=False)
+                                "arguments": _COMPACT_JSON_ENCODE(fc_args)
                             }
                         })
             
             # 始终创建chunk，即使内容为空（这对流式很重要）
-            if not self.original_model:
-                raise ValueError("Model name is required for streaming response")
-            
             # 构建delta内容
-            delta = {}
-            if content:
-                delta["content"] = content
-            if tool_calls:
-                delta["tool_calls"] = tool_calls
+            delta = _build_delta("".join(text_parts), tool_calls)
             
             result_data = {
-                "id": f"chatcmpl-{self._stream_id}",
+                "id": self._stream_id,
                 "object": "chat.completion.chunk",
-                "created": int(time.time()),
-                "model": self.original_model,
+                "created": self._stream_created,
+                "model": model,
                 "choices": [{
                     "index": 0,
                     "delta": delta,
@@ -699,14 +818,11 @@ class OpenAIConverter(BaseConverter):
         
         # 如果没有candidates，可能是其他类型的数据（如开头的metadata）
         # 返回空的delta保持流式连接
-        if not self.original_model:
-            raise ValueError("Model name is required for streaming response")
-        
         result_data = {
-            "id": f"chatcmpl-{self._stream_id}",
+            "id": self._stream_id,
             "object": "chat.completion.chunk", 
-            "created": int(time.time()),
-            "model": self.original_model,
+            "created": self._stream_created,
+            "model": model,
             "choices": [{
                 "index": 0,
                 "delta": {},
@@ -718,47 +834,42 @@ class OpenAIConverter(BaseConverter):
     
     def _convert_from_anthropic_streaming_chunk(self, data: Dict[str, Any]) -> ConversionResult:
         """转换Anthropic流式响应chunk到OpenAI格式"""
-        import time
-        import random
-        import string
         
         # 生成一致的随机ID（在同一次对话中保持一致）
-        if not hasattr(self, '_stream_id'):
-            self._stream_id = ''.join(random.choices(string.ascii_letters + string.digits, k=29))
+        if self._stream_id is None:
+            self._start_stream()
         
         # 必须有原始模型名称
-        if not self.original_model:
+        model = self.original_model
+        if not model:
             raise ValueError("Original model name is required for streaming response conversion")
         
         # Anthropic的流式响应是SSE格式，我们需要解析SSE事件
         # 如果传入的data是字符串，说明是完整的SSE事件
         if isinstance(data, str):
-            # 解析SSE事件
-            lines = data.strip().split('\n')
+            # 解析SSE事件（一次正则扫描取出所有event/data字段）
             event_type = None
             event_data = None
             
-            for line in lines:
-                if line.startswith('event: '):
-                    event_type = line[7:]
-                elif line.startswith('data: '):
-                    import json
-                    data_content = line[6:]
+            for field, value in _SSE_FIELD_RE.findall(data):
+                if field == "event":
+                    event_type = value
+                else:
                     # 检查是否是结束标记
-                    if data_content.strip() == "[DONE]":
+                    if value.strip() == "[DONE]":
                         break
                     try:
-                        event_data = json.loads(data_content)
+                        event_data = json.loads(value)
                     except json.JSONDecodeError:
                         continue
             
             if not event_data:
                 # 如果没有解析到数据，返回空的chunk
                 result_data = {
-                    "id": f"chatcmpl-{self._stream_id}",
+                    "id": self._stream_id,
                     "object": "chat.completion.chunk",
-                    "created": int(time.time()),
-                    "model": self.original_model,
+                    "created": self._stream_created,
+                    "model": model,
                     "choices": [{
                         "index": 0,
                         "delta": {},
@@ -772,11 +883,27 @@ class OpenAIConverter(BaseConverter):
             # 优先使用_sse_event字段（由unified_api添加），否则使用type字段
             event_type = event_data.get("_sse_event") or event_data.get("type", "")
         
+        # 快速路径：流中绝大多数事件是文本增量，直接构建带content的chunk，跳过通用分派
+        if event_type == "content_block_delta":
+            delta = event_data.get("delta")
+            if delta and delta.get("type") == "text_delta":
+                return ConversionResult(success=True, data={
+                    "id": self._stream_id,
+                    "object": "chat.completion.chunk",
+                    "created": self._stream_created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": delta.get("text", "")},
+                        "finish_reason": None
+                    }]
+                })
+        
         result_data = {
-            "id": f"chatcmpl-{self._stream_id}",
+            "id": self._stream_id,
             "object": "chat.completion.chunk",
-            "created": int(time.time()),
-            "model": self.original_model,
+            "created": self._stream_created,
+            "model": model,
             "choices": [{
                 "index": 0,
                 "delta": {},
@@ -784,73 +911,62 @@ class OpenAIConverter(BaseConverter):
             }]
         }
         
-        # 初始化工具调用状态跟踪
-        if not hasattr(self, '_anthropic_tool_state'):
-            self._anthropic_tool_state = {}
-        
-        # 根据事件类型处理
-        if event_type == "content_block_start":
-            # 内容块开始 - 检查是否是工具调用
-            content_block = event_data.get("content_block", {})
-            if content_block.get("type") == "tool_use":
-                tool_index = event_data.get("index", 0)
-                self._anthropic_tool_state[tool_index] = {
-                    "id": content_block.get("id", ""),
-                    "name": content_block.get("name", ""),
-                    "arguments": ""
+        # 根据事件类型分派处理，content_block_stop/message_start等无需处理的事件返回空delta
+        handler = self._anthropic_stream_handlers.get(event_type)
+        if handler is not None:
+            handler(event_data, result_data)
+        
+        return ConversionResult(success=True, data=result_data)
+    
+    def _anthropic_block_start(self, event_data: Dict[str, Any], result_data: Dict[str, Any]):
+        """内容块开始 - 检查是否是工具调用"""
+        content_block = event_data.get("content_block", {})
+        if content_block.get("type") == "tool_use":
+            tool_index = event_data.get("index", 0)
+            self._anthropic_tool_state[tool_index] = {
+                "id": content_block.get("id", ""),
+                "name": content_block.get("name", ""),
+                "arguments": ""
+            }
+            
+            # 返回工具调用开始的chunk
+            result_data["choices"][0]["delta"]["tool_calls"] = [{
+                "index": tool_index,
+                "id": content_block.get("id", ""),
+                "type": "function",
+                "function": {
+                    "name": content_block.get("name", "")
                 }
+            }]
+    
+    def _anthropic_block_delta(self, event_data: Dict[str, Any], result_data: Dict[str, Any]):
+        """内容增量（text_delta已在快速路径中处理）"""
+        delta = event_data.get("delta", {})
+        index = event_data.get("index", 0)
+        
+        if delta.get("type") == "input_json_delta":
+            # 工具调用参数增量
+            if index in self._anthropic_tool_state:
+                partial_json = delta.get("partial_json", "")
+                self._anthropic_tool_state[index]["arguments"] += partial_json
                 
-                # 返回工具调用开始的chunk
                 result_data["choices"][0]["delta"]["tool_calls"] = [{
-                    "index": tool_index,
-                    "id": content_block.get("id", ""),
-                    "type": "function",
+                    "index": index,
                     "function": {
-                        "name": content_block.get("name", "")
+                        "arguments": partial_json
                     }
                 }]
-        
-        elif event_type == "content_block_delta":
-            # 内容增量
-            delta = event_data.get("delta", {})
-            index = event_data.get("index", 0)
-            
-            if delta.get("type") == "text_delta":
-                # 文本内容
-                result_data["choices"][0]["delta"]["content"] = delta.get("text", "")
-            elif delta.get("type") == "input_json_delta":
-                # 工具调用参数增量
-                if index in self._anthropic_tool_state:
-                    partial_json = delta.get("partial_json", "")
-                    self._anthropic_tool_state[index]["arguments"] += partial_json
-                    
-                    result_data["choices"][0]["delta"]["tool_calls"] = [{
-                        "index": index,
-                        "function": {
-                            "arguments": partial_json
-                        }
-                    }]
-        
-        elif event_type == "content_block_stop":
-            # 内容块结束 - 对工具调用不需要特殊处理，已在delta中累积完成
-            pass
-        
-        elif event_type == "message_delta":
-            # 消息结束
-            delta = event_data.get("delta", {})
-            stop_reason = delta.get("stop_reason")
-            if stop_reason:
-                result_data["choices"][0]["finish_reason"] = self._map_finish_reason(stop_reason, "anthropic", "openai")
-        
-        elif event_type == "message_stop":
-            # 流结束 - 清理状态
-            result_data["choices"][0]["finish_reason"] = "stop"
-            if hasattr(self, '_anthropic_tool_state'):
-                delattr(self, '_anthropic_tool_state')
-        
-        # 其他事件类型（message_start）返回空delta
-        
-        return ConversionResult(success=True, data=result_data)
+    
+    def _anthropic_message_delta(self, event_data: Dict[str, Any], result_data: Dict[str, Any]):
+        """消息结束"""
+        stop_reason = event_data.get("delta", {}).get("stop_reason")
+        if stop_reason:
+            result_data["choices"][0]["finish_reason"] = _ANTHROPIC_TO_OPENAI_FINISH.get(stop_reason, "stop")
+    
+    def _anthropic_message_stop(self, event_data: Dict[str, Any], result_data: Dict[str, Any]):
+        """流结束 - 清理状态"""
+        result_data["choices"][0]["finish_reason"] = "stop"
+        self._anthropic_tool_state.clear()
     
     def _convert_content_to_anthropic(self, content: Any) -> Any:
         """转换内容到Anthropic格式"""
@@ -859,30 +975,25 @@ class OpenAIConverter(BaseConverter):
             return self._extract_thinking_from_text(content)
         elif isinstance(content, list):
             # 处理多模态内容 - 应用Anthropic最佳实践：图片在文本之前
-            text_items = []
-            image_items = []
-            other_items = []
+            # 单次遍历，按类型直接写入各自的输出列表，最后按 图片 -> 文本 -> 其他 拼接
+            image_blocks = []
+            text_blocks = []
+            other_blocks = []
             
-            # 1. 首先分类所有内容项
             for item in content:
-                if item.get("type") == "text":
-                    text_items.append(item)
-                elif item.get("type") == "image_url":
-                    image_items.append(item)
-                else:
-                    other_items.append(item)
-            
-            anthropic_content = []
-            
-            # 2. 首先处理图片（Anthropic最佳实践）
-            for item in image_items:
-                image_url = item.get("image_url", {}).get("url", "")
-                if image_url.startswith("data:"):
-                    # 处理base64图像
-                    try:
-                        media_type, data_part = image_url.split(";base64,", 1)
-                        media_type = media_type.replace("data:", "")
-                        anthropic_content.append({
+                item_type = item.get("type")
+                if item_type == "text":
+                    text_content = item.get("text", "")
+                    # 按顺序拆分出文本块和thinking块，直接写入输出列表
+                    text_blocks.extend(_iter_thinking_blocks(text_content))
+                    self.logger.debug("OpenAI->Anthropic: Text processed AFTER image (best practice): %.30s...", text_content)
+                elif item_type == "image_url":
+                    image_url = item.get("image_url", {}).get("url", "")
+                    parsed = _parse_data_url(image_url)
+                    if parsed is not None:
+                        # 处理base64图像
+                        media_type, data_part = parsed
+                        image_blocks.append({
                             "type": "image",
                             "source": {
                                 "type": "base64",
@@ -890,79 +1001,24 @@ class OpenAIConverter(BaseConverter):
                                 "data": data_part
                             }
                         })
-                        self.logger.info(f"✅ OpenAI->Anthropic: Image processed FIRST (best practice): {media_type}")
-                    except ValueError as e:
-                        self.logger.error(f"Failed to parse base64 image URL: {e}")
-            
-            # 3. 然后处理文本内容
-            for item in text_items:
-                text_content = item.get("text", "")
-                # 检查文本是否包含thinking标签
-                extracted = self._extract_thinking_from_text(text_content)
-                if isinstance(extracted, list):
-                    # 有thinking内容，直接添加到content列表
-                    anthropic_content.extend(extracted)
+                        self.logger.debug("OpenAI->Anthropic: Image processed FIRST (best practice): %s", media_type)
+                    elif image_url.startswith("data:"):
+                        self.logger.error("Failed to parse base64 image URL")
                 else:
-                    # 普通文本
-                    anthropic_content.append({
-                        "type": "text",
-                        "text": extracted
-                    })
-                self.logger.info(f"✅ OpenAI->Anthropic: Text processed AFTER image (best practice): {text_content[:30]}...")
+                    other_blocks.append(item)
             
-            # 4. 处理其他类型的内容
-            for item in other_items:
-                anthropic_content.append(item)
+            anthropic_content = image_blocks
+            anthropic_content.extend(text_blocks)
+            anthropic_content.extend(other_blocks)
             
             return anthropic_content
         return content
     
     def _extract_thinking_from_text(self, text: str) -> Any:
-        """从文本中提取thinking内容，返回Anthropic格式的content blocks"""
-        import re
-        
-        # 匹配 <thinking>...</thinking> 标签
-        thinking_pattern = r'<thinking>\s*(.*?)\s*</thinking>'
-        matches = re.finditer(thinking_pattern, text, re.DOTALL)
-        
-        content_blocks = []
-        last_end = 0
-        
-        for match in matches:
-            # 添加thinking标签之前的文本（如果有）
-            before_text = text[last_end:match.start()].strip()
-            if before_text:
-                content_blocks.append({
-                    "type": "text",
-                    "text": before_text
-                })
-            
-            # 添加thinking内容
-            thinking_text = match.group(1).strip()
-            if thinking_text:
-                content_blocks.append({
-                    "type": "thinking",
-                    "thinking": thinking_text
-                })
-            
-            last_end = match.end()
-        
-        # 添加最后一个thinking标签之后的文本（如果有）
-        after_text = text[last_end:].strip()
-        if after_text:
-            content_blocks.append({
-                "type": "text",
-                "text": after_text
-            })
-        
-        # 如果没有找到thinking标签，返回原文本
-        if not content_blocks:
-            return text
-        
-        # 如果只有一个文本块，返回字符串
-        if len(content_blocks) == 1 and content_blocks[0].get("type") == "text":
+        """从文本中提取thinking内容，返回Anthropic格式的content blocks（仅一个文本块时返回字符串）"""
+        content_blocks = list(_iter_thinking_blocks(text))
+        if len(content_blocks) == 1 and content_blocks[0]["type"] == "text":
             return content_blocks[0]["text"]
-        
         return content_blocks
     
     def _convert_content_to_gemini(self, content: Any) -> List[Dict[str, Any]]:
@@ -978,41 +1034,21 @@ class OpenAIConverter(BaseConverter):
                 elif item.get("type") == "image_url":
                     # 转换图像格式
                     image_url = item.get("image_url", {}).get("url", "")
-                    if image_url.startswith("data:"):
+                    parsed = _parse_data_url(image_url)
+                    if parsed is not None:
                         # 处理base64图像
-                        media_type, data_part = image_url.split(";base64,")
-                        media_type = media_type.replace("data:", "")
+                        media_type, data_part = parsed
                         gemini_parts.append({
                             "inlineData": {
                                 "mimeType": media_type,
                                 "data": data_part
                             }
                         })
+                    elif image_url.startswith("data:"):
+                        self.logger.error("Failed to parse base64 image URL")
             return gemini_parts
         return [{"text": str(content)}]
     
     def _map_finish_reason(self, reason: str, source_format: str, target_format: str) -> str:
         """映射结束原因"""
-        reason_mappings = {
-            "anthropic": {
-                "openai": {
-                    "end_turn": "stop",
-                    "max_tokens": "length",
-                    "stop_sequence": "stop",
-                    "tool_use": "tool_calls"
-                }
-            },
-            "gemini": {
-                "openai": {
-                    "STOP": "stop",
-                    "MAX_TOKENS": "length",
-                    "SAFETY": "content_filter",
-                    "RECITATION": "content_filter"
-                }
-            }
-        }
-        
-        try:
-            return reason_mappings[source_format][target_format].get(reason, "stop")
-        except KeyError:
-            return "stop"
+        return _FINISH_REASON_MAP.get((source_format, target_format), _NO_MAPPING).get(reason, "stop")
@@ -1,8 +1,38 @@
 """Utility helpers for reasoning effort mapping across converters."""
-from typing import Optional
+import functools
+import logging
+import os
+from typing import Optional, Tuple
 from .base_converter import ConversionError
 
 
+@functools.lru_cache(maxsize=16)
+def _get_thresholds(low_env_var: str, high_env_var: str) -> Tuple[int, int]:
+    """Read and parse the (low, high) thresholds once per env var pair.
+
+    The environment is loaded at startup and not changed at runtime, so the
+    parsed values are memoized. Failures raise and are therefore not cached.
+    """
+    low_threshold_str = os.environ.get(low_env_var)
+    high_threshold_str = os.environ.get(high_env_var)
+
+    if low_threshold_str is None:
+        raise ConversionError(
+            f"{low_env_var} environment variable is required for intelligent reasoning_effort determination"
+        )
+    if high_threshold_str is None:
+        raise ConversionError(
+            f"{high_env_var} environment variable is required for intelligent reasoning_effort determination"
+        )
+
+    try:
+        return int(low_threshold_str), int(high_threshold_str)
+    except ValueError as e:
+        raise ConversionError(
+            f"Invalid threshold values in environment variables: {e}. {low_env_var} and {high_env_var} must be integers."
+        )
+
+
 def determine_reasoning_effort(
     budget: Optional[int],
     low_env_var: str,
@@ -28,8 +58,6 @@ def determine_reasoning_effort(
     Raises:
         ConversionError: If required environment variables are missing or invalid.
     """
-    import os
-
     if budget is None or (allow_negative and budget == -1):
         reason = "dynamic thinking (-1)" if budget == -1 else "no budget provided"
         logger.info(
@@ -37,35 +65,15 @@ def determine_reasoning_effort(
         )
         return "high"
 
-    low_threshold_str = os.environ.get(low_env_var)
-    high_threshold_str = os.environ.get(high_env_var)
-
-    if low_threshold_str is None:
-        raise ConversionError(
-            f"{low_env_var} environment variable is required for intelligent reasoning_effort determination"
-        )
-    if high_threshold_str is None:
-        raise ConversionError(
-            f"{high_env_var} environment variable is required for intelligent reasoning_effort determination"
-        )
-
-    try:
-        low_threshold = int(low_threshold_str)
-        high_threshold = int(high_threshold_str)
-        logger.debug(
-            f"Threshold configuration: low <= {low_threshold}, medium <= {high_threshold}, high > {high_threshold}"
-        )
-        if budget <= low_threshold:
-            effort = "low"
-        elif budget <= high_threshold:
-            effort = "medium"
-        else:
-            effort = "high"
+    low_threshold, high_threshold = _get_thresholds(low_env_var, high_env_var)
+    if budget <= low_threshold:
+        effort = "low"
+    elif budget <= high_threshold:
+        effort = "medium"
+    else:
+        effort = "high"
+    if logger.isEnabledFor(logging.INFO):
         logger.info(
             f"🎯 {budget_label} {budget} -> reasoning_effort '{effort}' (thresholds: low<={low_threshold}, high<={high_threshold})"
         )
-        return effort
-    except ValueError as e:
-        raise ConversionError(
-            f"Invalid threshold values in environment variables: {e}. {low_env_var} and {high_env_var} must be integers."
-        )
+    return effort
@@ -2,17 +2,41 @@
 认证和授权管理
 """
 import hashlib
+import hmac
 import secrets
 import os
-from typing import Optional
+import threading
+import time
+from typing import Dict, Optional
 from datetime import datetime, timedelta
 
 from src.utils.database import db_manager
 from src.utils.logger import setup_logger
 from src.utils.env_config import env_config
+from src.utils.security import mask_api_key
 
 logger = setup_logger("auth")
 
+# 密码哈希参数：scrypt为内存困难型KDF，交互式登录场景下单次约数十毫秒
+SCRYPT_PREFIX = "scrypt$"
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1, "dklen": 32}
+
+# 进程内会话缓存的最长信任时间（秒），超过后重新查库；
+# 多工作进程运行时（env_config.multi_worker）不使用缓存，登出/改密在所有进程中立即生效
+SESSION_CACHE_TTL = 60
+
+
+class _LazyStr:
+    """延迟求值的日志参数，只有日志真正输出时才调用func"""
+    __slots__ = ("func", "args")
+    
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+    
+    def __str__(self) -> str:
+        return self.func(*self.args)
+
 
 class AuthManager:
     """认证管理器"""
@@ -20,7 +44,14 @@ class AuthManager:
     def __init__(self):
         # 固定会话超时时间为1天
         self.session_timeout = timedelta(days=1)
+        # 会话令牌 -> 缓存失效时间（epoch秒），命中时无需访问数据库
+        self._session_cache: Dict[str, float] = {}
+        self._session_cache_enabled = not env_config.multi_worker
+        # 会话失效（登出/改密）时递增；查库期间代数变化说明读到的可能是已删除的会话，不写入缓存
+        self._session_generation = 0
+        self._session_cache_lock = threading.Lock()
         self._ensure_admin_password()
+        self._migrate_session_expiry()
     
     def _ensure_admin_password(self):
         """确保管理员密码已设置"""
@@ -45,22 +76,49 @@ class AuthManager:
                 password_prefix = env_password[:3] + "***" if len(env_password) >= 3 else "***"
                 logger.info(f"Admin password updated from environment config (prefix: {password_prefix})")
     
+    def _migrate_session_expiry(self):
+        """将旧版ISO时间格式的会话过期时间一次性改写为epoch秒（所有改写在一个事务内提交）"""
+        migrated = {}
+        for config in db_manager.get_configs_by_prefix("session:"):
+            expires_at_str = config["value"]
+            if expires_at_str.isdigit():
+                continue
+            try:
+                expires_at = int(datetime.fromisoformat(expires_at_str).timestamp())
+            except ValueError:
+                # 无效格式留给cleanup_expired_sessions删除
+                continue
+            migrated[config["key"]] = str(expires_at)
+        db_manager.set_configs(migrated)
+    
     def hash_password(self, password: str) -> str:
-        """对密码进行哈希"""
+        """对密码进行哈希（scrypt，格式: scrypt$<salt>$<hash>）"""
         # 使用随机盐值
-        salt = secrets.token_hex(32)
-        password_hash = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-        return f"{salt}:{password_hash.hex()}"
+        salt = secrets.token_bytes(16)
+        password_hash = hashlib.scrypt(password.encode(), salt=salt, **SCRYPT_PARAMS)
+        return f"{SCRYPT_PREFIX}{salt.hex()}${password_hash.hex()}"
     
     def verify_password(self, password: str, password_hash: str) -> bool:
-        """验证密码"""
+        """验证密码，兼容旧版PBKDF2格式（salt:hash）"""
         try:
-            salt, stored_hash = password_hash.split(':')
-            password_hash_check = hashlib.pbkdf2_hmac('sha256', password.encode(), salt.encode(), 100000)
-            return stored_hash == password_hash_check.hex()
+            password_bytes = password.encode()
+            if password_hash.startswith(SCRYPT_PREFIX):
+                salt_hex, stored_hash = password_hash[len(SCRYPT_PREFIX):].split('$')
+                password_hash_check = hashlib.scrypt(
+                    password_bytes, salt=bytes.fromhex(salt_hex), **SCRYPT_PARAMS
+                )
+            else:
+                # 旧版格式以十六进制盐字符串本身作为PBKDF2的盐
+                salt, stored_hash = password_hash.split(':')
+                password_hash_check = hashlib.pbkdf2_hmac('sha256', password_bytes, salt.encode(), 100000)
+            return hmac.compare_digest(stored_hash, password_hash_check.hex())
         except Exception:
             return False
     
+    def needs_rehash(self, password_hash: str) -> bool:
+        """是否为需要升级的旧版密码哈希"""
+        return not password_hash.startswith(SCRYPT_PREFIX)
+    
     def set_admin_password(self, password: str, invalidate_sessions: bool = True):
         """设置管理员密码"""
         password_hash = self.hash_password(password)
@@ -78,7 +136,13 @@ class AuthManager:
         stored_hash = db_manager.get_config("admin_password_hash")
         if not stored_hash:
             return False
-        return self.verify_password(password, stored_hash)
+        if not self.verify_password(password, stored_hash):
+            return False
+        if self.needs_rehash(stored_hash):
+            # 旧版PBKDF2哈希验证通过后升级为scrypt，之后不再走旧路径
+            db_manager.set_config("admin_password_hash", self.hash_password(password))
+            logger.info("Admin password hash upgraded to scrypt")
+        return True
     
     def generate_session_token(self) -> str:
         """生成会话令牌"""
@@ -90,10 +154,12 @@ class AuthManager:
             return None
         
         session_token = self.generate_session_token()
-        expires_at = (datetime.now() + self.session_timeout).isoformat()
+        expires_at = int(time.time() + self.session_timeout.total_seconds())
         
-        # 存储会话信息
-        db_manager.set_config(f"session:{session_token}", expires_at)
+        # 存储会话信息（过期时间为epoch秒，便于在SQL中直接比较）
+        generation = self._session_generation
+        db_manager.set_config(f"session:{session_token}", str(expires_at))
+        self._cache_session(session_token, expires_at, generation)
         
         logger.info("New admin session created")
         return session_token
@@ -103,20 +169,50 @@ class AuthManager:
         if not session_token:
             return False
         
+        # 先查进程内缓存，命中且未过期则直接通过
+        cached_until = self._session_cache.get(session_token)
+        if cached_until is not None:
+            if cached_until > time.time():
+                return True
+            # 其他线程可能已同时移除该条目
+            self._session_cache.pop(session_token, None)
+        
+        generation = self._session_generation
         expires_at_str = db_manager.get_config(f"session:{session_token}")
         if not expires_at_str:
             return False
         
         try:
-            expires_at = datetime.fromisoformat(expires_at_str)
-            if datetime.now() > expires_at:
+            expires_at = int(expires_at_str)
+            if time.time() > expires_at:
                 # 会话已过期，删除
                 self.delete_session(session_token)
                 return False
+            self._cache_session(session_token, expires_at, generation)
             return True
         except Exception:
             return False
     
+    def _cache_session(self, session_token: str, expires_at: float, generation: int):
+        """缓存会话，缓存时间不超过会话过期时间和SESSION_CACHE_TTL
+        
+        generation为查库前读取的会话代数，期间有会话失效时不缓存，避免已删除的会话复活。
+        """
+        if not self._session_cache_enabled:
+            return
+        with self._session_cache_lock:
+            if generation == self._session_generation:
+                self._session_cache[session_token] = min(expires_at, time.time() + SESSION_CACHE_TTL)
+    
+    def _invalidate_session_cache(self, session_token: Optional[str] = None):
+        """会话已从数据库删除后调用：递增代数并移除缓存（session_token为None时清空全部）"""
+        with self._session_cache_lock:
+            self._session_generation += 1
+            if session_token is None:
+                self._session_cache.clear()
+            else:
+                self._session_cache.pop(session_token, None)
+    
     def delete_session(self, session_token: str):
         """删除会话"""
         if not session_token:
@@ -124,24 +220,21 @@ class AuthManager:
         
         session_key = f"session:{session_token}"
         deleted = db_manager.delete_config(session_key)
+        # 先删库再清缓存：删库前开始的查询不会再把该会话写回缓存
+        self._invalidate_session_cache(session_token)
         
-        from src.utils.security import mask_api_key
+        masked_token = _LazyStr(mask_api_key, session_token)
         if deleted:
-            logger.info(f"Session {mask_api_key(session_token)} deleted successfully")
+            logger.info("Session %s deleted successfully", masked_token)
         else:
-            logger.warning(f"Failed to delete session {mask_api_key(session_token)} - not found")
+            logger.warning("Failed to delete session %s - not found", masked_token)
     
     def invalidate_all_sessions(self):
         """使所有会话失效 - 用于密码修改后的安全措施"""
         try:
-            # 获取所有session配置
-            session_configs = db_manager.get_configs_by_prefix("session:")
-            deleted_count = 0
-            
-            for config in session_configs:
-                session_key = config["key"]
-                if db_manager.delete_config(session_key):
-                    deleted_count += 1
+            # 单条DELETE清除所有session配置
+            deleted_count = db_manager.delete_configs_by_prefix("session:")
+            self._invalidate_session_cache()
             
             if deleted_count > 0:
                 logger.info(f"Invalidated {deleted_count} sessions due to password change")
@@ -156,29 +249,15 @@ class AuthManager:
     def cleanup_expired_sessions(self):
         """清理过期会话"""
         try:
-            # 获取所有session配置
-            session_configs = db_manager.get_configs_by_prefix("session:")
-            current_time = datetime.now()
-            cleaned_count = 0
-            
-            for config in session_configs:
-                session_key = config["key"]
-                expires_at_str = config["value"]
-                
-                try:
-                    expires_at = datetime.fromisoformat(expires_at_str)
-                    if current_time > expires_at:
-                        # 会话已过期，删除
-                        if db_manager.delete_config(session_key):
-                            cleaned_count += 1
-                            session_token = session_key.replace("session:", "")
-                            from src.utils.security import mask_api_key
-                            logger.debug(f"Cleaned expired session: {mask_api_key(session_token)}")
-                except Exception as e:
-                    # 无效的时间格式，删除这个配置
-                    logger.warning(f"Invalid session expiry format for {session_key}: {e}")
-                    if db_manager.delete_config(session_key):
-                        cleaned_count += 1
+            # 过期时间以epoch秒存储，由数据库单条DELETE完成比较和删除（无效格式按0处理，一并删除）
+            now = int(time.time())
+            cleaned_count = db_manager.delete_expired_configs("session:", now)
+            # 先取快照：其他线程可能正在移除缓存条目，直接遍历会因字典大小变化而报错
+            with self._session_cache_lock:
+                self._session_cache = {
+                    token: cached_until for token, cached_until in list(self._session_cache.items())
+                    if cached_until > now
+                }
             
             logger.info(f"Session cleanup completed. Removed {cleaned_count} expired sessions")
             return cleaned_count
@@ -188,5 +267,19 @@ class AuthManager:
             return 0
 
 
-# 全局认证管理器实例
-auth_manager = AuthManager()
+# 全局认证管理器实例（懒加载，首次使用时才校验/初始化管理员密码）
+_auth_manager = None
+
+def get_auth_manager() -> AuthManager:
+    """获取认证管理器实例"""
+    global _auth_manager
+    if _auth_manager is None:
+        _auth_manager = AuthManager()
+    return _auth_manager
+
+# 向后兼容的属性访问
+class _AuthManagerProxy:
+    def __getattr__(self, name):
+        return getattr(get_auth_manager(), name)
+
+auth_manager = _AuthManagerProxy()
@@ -2,21 +2,173 @@
 数据库管理器
 支持SQLite和MySQL数据库，用于存储渠道信息和系统配置
 """
+import asyncio
+import functools
 import sqlite3
 import pymysql
 import os
 import json
-import uuid
-from typing import Dict, List, Optional, Any, Union
-from datetime import datetime
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple, Union
 from contextlib import contextmanager
 
+from pymysql.constants import SERVER_STATUS
+
 from src.utils.logger import setup_logger
 from src.utils.env_config import env_config
-from src.utils.encryption import encryption_manager
 
 logger = setup_logger("database")
 
+try:
+    import orjson  # 可选依赖：更快的JSON解析
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# sqlite3连接的预编译语句缓存大小（默认128）
+SQLITE_CACHED_STATEMENTS = 256
+
+# MySQL连接池保留的空闲连接数上限（超出的连接用完即关闭）
+MYSQL_POOL_SIZE = 8
+
+# 已解密渠道缓存的有效期（秒）：本进程写入时立即失效；
+# 缓存无法感知其他进程的修改，多工作进程运行时（env_config.multi_worker）不使用缓存
+CHANNEL_CACHE_TTL = 30
+
+# 每个渠道缓存最多保留的条目数，超出时淘汰最久未使用的
+CHANNEL_CACHE_MAXSIZE = 1024
+
+# 加密后密钥的前缀（与APIKeyEncryption一致）
+_ENCRYPTED_PREFIX = "encrypted:"
+
+# 前端误把JavaScript报错信息当作API密钥提交时的特征
+_BAD_API_KEY_RE = re.compile(r"^script\.js:|Uncaught TypeError")
+
+# channels表的列（显式列出，行可按固定顺序直接转换为字典，不依赖表中实际列顺序）
+_CHANNEL_COLUMNS = (
+    "id", "name", "provider", "base_url", "api_key", "custom_key", "timeout", "max_retries",
+    "enabled", "models_mapping", "use_proxy", "proxy_type", "proxy_host", "proxy_port",
+    "proxy_username", "proxy_password", "created_at", "updated_at",
+)
+_CHANNEL_SELECT = f"SELECT {', '.join(_CHANNEL_COLUMNS)} FROM channels"
+
+# 由数据库生成当前（本地）时间，写入时无需在Python中构造datetime并格式化
+_NOW_SQL = {
+    "sqlite": "strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')",
+    "mysql": "NOW()",
+}
+
+_INSERT_CHANNEL_SQL = {
+    db_type: f'''
+    INSERT INTO channels 
+    (id, name, provider, base_url, api_key, custom_key, timeout, max_retries, 
+     enabled, models_mapping, use_proxy, proxy_type, proxy_host, proxy_port, 
+     proxy_username, proxy_password, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {now}, {now})
+'''
+    for db_type, now in _NOW_SQL.items()
+}
+
+# update_channel可更新的字段，顺序即UPDATE语句中参数的顺序
+_UPDATABLE_CHANNEL_FIELDS = (
+    "name", "base_url", "api_key", "custom_key", "timeout", "max_retries", "enabled",
+    "models_mapping", "use_proxy", "proxy_type", "proxy_host", "proxy_port", "proxy_username",
+    "proxy_password",
+)
+
+# 固定的UPDATE语句：传入NULL的字段保持原值，每次调用复用同一条预编译语句
+_UPDATE_CHANNEL_SQL = {
+    db_type: (
+        "UPDATE channels SET "
+        + ", ".join(f"{field} = COALESCE(?, {field})" for field in _UPDATABLE_CHANNEL_FIELDS)
+        + f", updated_at = {now} WHERE id = ?"
+    )
+    for db_type, now in _NOW_SQL.items()
+}
+
+# 写入系统配置（存在则原地更新value/updated_at，保留created_at），参数为 (key, value)
+_SET_CONFIG_SQL = {
+    "sqlite": f'''
+        INSERT INTO system_config (key, value, created_at, updated_at)
+        VALUES (?, ?, {_NOW_SQL["sqlite"]}, {_NOW_SQL["sqlite"]})
+        ON CONFLICT(key) DO UPDATE SET
+        value = excluded.value,
+        updated_at = excluded.updated_at
+    ''',
+    "mysql": f'''
+        INSERT INTO system_config (`key`, `value`, created_at, updated_at)
+        VALUES (?, ?, {_NOW_SQL["mysql"]}, {_NOW_SQL["mysql"]})
+        ON DUPLICATE KEY UPDATE
+        `value` = VALUES(`value`),
+        updated_at = VALUES(updated_at)
+    ''',
+}
+
+_GET_CONFIG_SQL = {
+    "sqlite": "SELECT value FROM system_config WHERE key = ?",
+    "mysql": "SELECT `value` FROM system_config WHERE `key` = ?",
+}
+
+# 表结构版本：记录在system_config中，已是最新版本时启动跳过迁移检查
+_SCHEMA_VERSION_KEY = "schema_version"
+_SCHEMA_VERSION = "2"
+
+# channels表的二级索引：名称 -> 列（按provider/enabled过滤，按created_at排序可直接走索引；
+# custom_key已有UNIQUE约束自带的索引）
+_CHANNEL_INDEXES = {
+    "idx_channels_provider_enabled": "provider, enabled, created_at",
+    "idx_channels_enabled_created": "enabled, created_at",
+    "idx_channels_created": "created_at",
+}
+
+# SQLite连接级PRAGMA：WAL下synchronous=NORMAL只在checkpoint时fsync，
+# 临时表放内存，读取走mmap，页缓存约20MB（每个线程一个连接，不宜过大），
+# 锁冲突时最多等待5秒，WAL每1000页自动checkpoint
+_SQLITE_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+
+
+@functools.lru_cache(maxsize=SQLITE_CACHED_STATEMENTS)
+def _mysql_placeholders(query: str) -> str:
+    """将SQLite的?占位符转换为MySQL的%s占位符（SQL基本是固定模板，每条只转换一次）"""
+    return query.replace('?', '%s')
+
+
+def _prefix_range(prefix: str) -> Tuple[str, str]:
+    """前缀匹配改写为主键范围 [prefix, 上界)
+    
+    SQLite的LIKE默认不区分大小写，无法使用BINARY排序的主键索引，会全表扫描；
+    范围条件可以直接走索引，且不会把前缀中的%和_当作通配符。
+    （MySQL的LIKE前缀可走索引，且utf8mb4_unicode_ci下标点排序与码点不同，不适用此改写）
+    """
+    if not prefix:
+        return "", chr(0x10FFFF)
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _encryption():
+    """首次加解密时才导入加密模块并创建管理器：其初始化需要导入cryptography并读取/生成密钥"""
+    from src.utils.encryption import get_encryption_manager
+    return get_encryption_manager()
+
+
+def _validate_api_key(api_key: str):
+    """验证API密钥不是明显的JavaScript错误信息"""
+    if _BAD_API_KEY_RE.search(api_key):
+        logger.error(f"Rejecting JavaScript error message as API key: {api_key[:50]}...")
+        raise ValueError("Invalid API key: JavaScript error message detected")
+
 
 class DatabaseManager:
     """数据库管理器，支持SQLite和MySQL"""
@@ -25,13 +177,64 @@ class DatabaseManager:
         self.db_type = env_config.database_type
         self.db_path = db_path or env_config.database_path
         self._initialized = False
+        # SQLite每个线程复用一个持久连接，避免每次查询都重新打开数据库
+        self._local = threading.local()
+        # SQLite写连接：所有线程共用一个，由锁保证同一时刻只有一个写事务
+        self._sqlite_writer: Optional[sqlite3.Connection] = None
+        self._sqlite_write_lock = threading.Lock()
+        # MySQL空闲连接池（后进先出，优先复用最近使用、最不可能已超时的连接）
+        self._mysql_pool: "queue.LifoQueue" = queue.LifoQueue(maxsize=MYSQL_POOL_SIZE)
+        # 已解密的渠道缓存（LRU）：custom_key / id -> (过期时间, 渠道字典)
+        self._channel_cache_lock = threading.RLock()
+        self._channel_cache_by_key: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._channel_cache_by_id: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._channel_cache_enabled = not env_config.multi_worker
+        # 渠道写入时递增；查库期间代数变化说明读到的可能是修改/删除前的行，不写入缓存
+        self._channel_cache_generation = 0
+        # has_encrypted_api_keys的缓存结果（None表示尚未查询）
+        self._encrypted_keys_known: Optional[bool] = None
+        # 读到未加密的旧密钥时只提示一次
+        self._plaintext_key_warned = False
         
-        if self.db_type == "sqlite":
+        # SQLite内存库（测试/CI用）：DATABASE_PATH为":memory:"或"file::memory:..."
+        self._memory_db = self.db_type == "sqlite" and self.db_path.startswith((":memory:", "file::memory:"))
+        # 内存库在最后一个连接关闭时即被销毁，初始化连接保持打开以固定其生命周期
+        self._memory_keeper: Optional[sqlite3.Connection] = None
+        
+        if self.db_type == "sqlite" and not self._memory_db:
             self._ensure_data_dir()
+        # MySQL连接参数只构建一次，连接池新建连接时直接复用
+        self._mysql_connect_params = self._build_mysql_connect_params() if self.db_type == "mysql" else None
         
         # 立即验证数据库连接，不再使用懒加载
         self._ensure_initialized()
     
+    @staticmethod
+    def _build_mysql_connect_params() -> Dict[str, Any]:
+        """根据环境配置构建pymysql.connect参数"""
+        connect_params = {
+            'host': env_config.mysql_host,
+            'port': env_config.mysql_port,
+            'user': env_config.mysql_user,
+            'password': env_config.mysql_password,
+            'database': env_config.mysql_database,
+            'charset': 'utf8mb4',
+            'cursorclass': pymysql.cursors.DictCursor,  # 使结果可以通过列名访问
+            'autocommit': True,     # 读取不开启事务；写入由get_connection(write=True)显式BEGIN
+            'connect_timeout': 5,   # 减少连接超时时间
+            'read_timeout': 10,     # 减少读取超时时间
+            'write_timeout': 10,    # 减少写入超时时间
+            'ssl_disabled': False   # Enable SSL for cloud databases
+        }
+        
+        # 如果配置了socket路径，则使用socket连接（不需要host和port）
+        if env_config.mysql_socket:
+            connect_params['unix_socket'] = env_config.mysql_socket
+            connect_params.pop('host', None)
+            connect_params.pop('port', None)
+        
+        return connect_params
+    
     def _ensure_initialized(self):
         """确保数据库已初始化"""
         if not self._initialized:
@@ -47,44 +250,40 @@ class DatabaseManager:
         """确保SQLite数据目录存在"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-    def _get_raw_connection(self):
+    def _get_raw_connection(self, check_same_thread: bool = True):
         """获取原始数据库连接（不检查初始化状态）"""
         if self.db_type == "sqlite":
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            if self._memory_db:
+                # 共享缓存的命名内存库：本实例的所有连接看到同一个数据库
+                target, uri = f"file:apiconv_{id(self)}?mode=memory&cache=shared", True
+            else:
+                target, uri = self.db_path, False
+            conn = sqlite3.connect(
+                target, cached_statements=SQLITE_CACHED_STATEMENTS, check_same_thread=check_same_thread, uri=uri
+            )
+            conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
+            for pragma in _SQLITE_CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            if self._memory_db:
+                # 共享缓存模式使用表级锁，读写并发时直接报"table is locked"（busy_timeout无效）；
+                # 读连接不加表锁，写入仍由_sqlite_write_lock串行
+                conn.execute("PRAGMA read_uncommitted=1")
             return conn
         elif self.db_type == "mysql":
-            connect_params = {
-                'host': env_config.mysql_host,
-                'port': env_config.mysql_port,
-                'user': env_config.mysql_user,
-                'password': env_config.mysql_password,
-                'database': env_config.mysql_database,
-                'charset': 'utf8mb4',
-                'cursorclass': pymysql.cursors.DictCursor,
-                'autocommit': False,
-                'connect_timeout': 5,   # 减少连接超时时间
-                'read_timeout': 10,    # 减少读取超时时间  
-                'write_timeout': 10,   # 减少写入超时时间
-                'ssl_disabled': False  # Enable SSL for cloud databases
-            }
-            
-            if env_config.mysql_socket:
-                connect_params['unix_socket'] = env_config.mysql_socket
-                connect_params.pop('host', None)
-                connect_params.pop('port', None)
-            
-            return pymysql.connect(**connect_params)
+            return pymysql.connect(**self._mysql_connect_params)
         else:
             raise ValueError(f"Unsupported database type: {self.db_type}")
     
-    def _execute_query(self, conn, query: str, params: tuple = None):
-        """执行查询，自动处理SQLite和MySQL的差异"""
-        cursor = conn.cursor()
+    def _execute_query(self, conn, query: str, params: tuple = None, tuple_rows: bool = False):
+        """执行查询，自动处理SQLite和MySQL的差异
+        
+        tuple_rows=True时结果为普通元组（SQLite不构造sqlite3.Row，MySQL不构造DictCursor字典），
+        供按固定列顺序解码的热路径使用。
+        """
+        cursor = self._get_cursor(conn, query, tuple_rows)
         
         if self.db_type == "mysql":
-            # 将SQLite的?占位符转换为MySQL的%s占位符
-            query = query.replace('?', '%s')
+            query = _mysql_placeholders(query)
         
         if params:
             cursor.execute(query, params)
@@ -93,50 +292,133 @@ class DatabaseManager:
         
         return cursor
     
+    def _get_cursor(self, conn, query: str, tuple_rows: bool):
+        """获取执行query的游标：当前线程的SQLite持久连接按SQL复用游标，其余情况新建"""
+        if self.db_type == "mysql":
+            return conn.cursor(pymysql.cursors.Cursor) if tuple_rows else conn.cursor()
+        
+        cursors = getattr(self._local, "cursors", None) if conn is getattr(self._local, "conn", None) else None
+        key = (query, tuple_rows)
+        cursor = cursors.get(key) if cursors is not None else None
+        if cursor is None:
+            cursor = conn.cursor()
+            if tuple_rows:
+                cursor.row_factory = None
+            # 动态拼接的SQL（如IN列表）不会无限占用缓存
+            if cursors is not None and len(cursors) < SQLITE_CACHED_STATEMENTS:
+                cursors[key] = cursor
+        return cursor
+    
+    def _execute_many(self, conn, query: str, params_seq: List[tuple]):
+        """批量执行同一语句（一次预编译），自动处理SQLite和MySQL的差异"""
+        cursor = conn.cursor()
+        
+        if self.db_type == "mysql":
+            query = _mysql_placeholders(query)
+        
+        cursor.executemany(query, params_seq)
+        return cursor
+    
     @contextmanager
-    def get_connection(self):
-        """获取数据库连接的上下文管理器"""
+    def get_connection(self, write: bool = False):
+        """获取数据库连接的上下文管理器
+        
+        SQLite下write=True时使用进程内唯一的写连接（加锁串行），读取使用各线程自己的连接：
+        WAL只允许一个写者，写入在进程内排队，不再靠busy_timeout轮询重试。
+        读取在两种数据库上都以自动提交的单语句执行，不持有事务和快照；
+        MySQL仅在write=True时显式BEGIN。
+        """
         self._ensure_initialized()
         
         if self.db_type == "sqlite":
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # 使结果可以通过列名访问
+            if write:
+                with self._sqlite_write_lock:
+                    conn = self._get_sqlite_writer()
+                    try:
+                        yield conn
+                    finally:
+                        if conn.in_transaction:
+                            conn.rollback()
+                return
+            conn = self._get_sqlite_connection()
+            try:
+                yield conn
+            except Exception as e:
+                conn.rollback()
+                raise e
+            finally:
+                # 连接保持打开；未提交的事务与关闭连接时一样回滚
+                if conn.in_transaction:
+                    conn.rollback()
+            return
         elif self.db_type == "mysql":
-            # MySQL连接参数
-            connect_params = {
-                'host': env_config.mysql_host,
-                'port': env_config.mysql_port,
-                'user': env_config.mysql_user,
-                'password': env_config.mysql_password,
-                'database': env_config.mysql_database,
-                'charset': 'utf8mb4',
-                'cursorclass': pymysql.cursors.DictCursor,  # 使结果可以通过列名访问
-                'autocommit': False,
-                'connect_timeout': 5,   # 5秒连接超时
-                'read_timeout': 10,     # 10秒读取超时
-                'write_timeout': 10,    # 10秒写入超时
-                'ssl_disabled': False   # Enable SSL for cloud databases
-            }
-            
-            # 如果配置了socket路径，则使用socket连接
-            if env_config.mysql_socket:
-                connect_params['unix_socket'] = env_config.mysql_socket
-                # 使用socket时不需要host和port
-                connect_params.pop('host', None)
-                connect_params.pop('port', None)
-            
-            conn = pymysql.connect(**connect_params)
+            conn = self._acquire_mysql_connection()
+            if write:
+                try:
+                    conn.begin()
+                except Exception:
+                    self._close_quietly(conn)
+                    raise
         else:
             raise ValueError(f"Unsupported database type: {self.db_type}")
         
         try:
             yield conn
-        except Exception as e:
-            if hasattr(conn, 'rollback'):
-                conn.rollback()
-            raise e
         finally:
+            # 放回连接池前回滚未提交的写事务（与原先关闭连接的效果相同）
+            self._release_mysql_connection(conn)
+    
+    def _acquire_mysql_connection(self):
+        """从连接池取出MySQL连接，池为空时新建"""
+        try:
+            conn = self._mysql_pool.get_nowait()
+        except queue.Empty:
+            return self._get_raw_connection()
+        try:
+            # 空闲期间可能被服务端wait_timeout断开，ping失败时自动重连
+            conn.ping(reconnect=True)
+            return conn
+        except Exception:
+            self._close_quietly(conn)
+            return self._get_raw_connection()
+    
+    def _release_mysql_connection(self, conn):
+        """结束连接上未提交的事务并放回连接池（池满或连接已损坏时关闭）"""
+        try:
+            # 只读使用时没有打开的事务，省去一次ROLLBACK往返
+            if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                conn.rollback()
+            self._mysql_pool.put_nowait(conn)
+        except Exception:
+            # queue.Full 或连接已断开
+            self._close_quietly(conn)
+    
+    @staticmethod
+    def _close_quietly(conn):
+        """关闭连接并忽略错误"""
+        try:
             conn.close()
+        except Exception:
+            pass
+    
+    def _get_sqlite_writer(self):
+        """获取SQLite写连接（首次使用时创建，调用方需持有_sqlite_write_lock）"""
+        if self._sqlite_writer is None:
+            conn = self._get_raw_connection(check_same_thread=False)
+            # 写路径只依赖rowcount，少量查询按位置取值，不需要sqlite3.Row
+            conn.row_factory = None
+            self._sqlite_writer = conn
+        return self._sqlite_writer
+    
+    def _get_sqlite_connection(self):
+        """获取当前线程的持久SQLite连接（首次使用时创建）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._get_raw_connection()
+            self._local.conn = conn
+            # (SQL, tuple_rows) -> 复用的游标
+            self._local.cursors = {}
+        return conn
     
     def _init_database(self):
         """初始化数据库表"""
@@ -145,6 +427,11 @@ class DatabaseManager:
             cursor = conn.cursor()
             
             if self.db_type == "sqlite":
+                # WAL模式写入数据库文件后持久生效：读写互不阻塞，提交无需每次fsync
+                cursor.execute("PRAGMA journal_mode=WAL")
+                # SQLite的DDL默认各自提交；建表、建索引和迁移放进同一个事务，启动时只提交一次
+                cursor.execute("BEGIN")
+                
                 # SQLite表结构
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS channels (
@@ -169,6 +456,9 @@ class DatabaseManager:
                     )
                 ''')
                 
+                for index_name, columns in _CHANNEL_INDEXES.items():
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON channels({columns})")
+                
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS system_config (
                         key TEXT PRIMARY KEY,
@@ -203,6 +493,13 @@ class DatabaseManager:
                     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
                 ''')
                 
+                # MySQL不支持CREATE INDEX IF NOT EXISTS，先查询已有索引
+                cursor.execute("SHOW INDEX FROM channels")
+                existing_indexes = {row['Key_name'] for row in cursor.fetchall()}
+                for index_name, columns in _CHANNEL_INDEXES.items():
+                    if index_name not in existing_indexes:
+                        cursor.execute(f"CREATE INDEX {index_name} ON channels({columns})")
+                
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS system_config (
                         `key` VARCHAR(255) PRIMARY KEY,
@@ -212,18 +509,25 @@ class DatabaseManager:
                     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
                 ''')
             
-            conn.commit()
-            
             # 进行数据库迁移 - 添加代理字段（如果不存在）
             self._migrate_proxy_fields(cursor, conn)
+            # 迁移出错时其内部不会提交，这里确保建表结果落盘
+            conn.commit()
             
             logger.info(f"Database ({self.db_type}) initialized successfully")
         finally:
-            conn.close()
+            if self._memory_db:
+                self._memory_keeper = conn
+            else:
+                conn.close()
 
     def _migrate_proxy_fields(self, cursor, conn):
-        """迁移数据库，添加代理字段（如果不存在）"""
+        """迁移数据库，添加代理字段（如果不存在）；schema_version已是最新时直接跳过"""
         try:
+            row = self._execute_query(conn, _GET_CONFIG_SQL[self.db_type], (_SCHEMA_VERSION_KEY,)).fetchone()
+            if row and row['value'] == _SCHEMA_VERSION:
+                return
+            
             if self.db_type == "sqlite":
                 # 检查是否已经存在代理字段
                 cursor.execute("PRAGMA table_info(channels)")
@@ -258,11 +562,88 @@ class DatabaseManager:
                     if field not in columns:
                         cursor.execute(f"ALTER TABLE channels ADD COLUMN {field} {field_type}")
                         logger.info(f"Added column {field} to channels table")
-                        
+            
+            self._execute_query(conn, _SET_CONFIG_SQL[self.db_type], (_SCHEMA_VERSION_KEY, _SCHEMA_VERSION))
             conn.commit()
         except Exception as e:
             logger.warning(f"Migration warning (proxy fields may already exist): {e}")
     
+    def _row_to_channel(self, row, include_keys: bool = True) -> Dict[str, Any]:
+        """将channels查询行转换为渠道字典：解析models_mapping，按需解密API密钥和代理密码"""
+        # tuple_rows查询返回元组，按_CHANNEL_COLUMNS顺序组装
+        channel = dict(zip(_CHANNEL_COLUMNS, row))
+        models_mapping = channel['models_mapping']
+        if models_mapping:
+            # 空映射（更新时清空写入的"{}"）无需走JSON解析
+            channel['models_mapping'] = {} if models_mapping == "{}" else _json_loads(models_mapping)
+        if include_keys:
+            self._decrypt_channel_secrets((channel,))
+        return channel
+    
+    def _rows_to_channels(self, rows, include_keys: bool = True) -> List[Dict[str, Any]]:
+        """批量转换channels查询行，所有行的密钥通过一次decrypt_many解密"""
+        row_to_channel = self._row_to_channel
+        channels = [row_to_channel(row, False) for row in rows]
+        if include_keys and channels:
+            self._decrypt_channel_secrets(channels)
+        return channels
+    
+    def _decrypt_channel_secrets(self, channels):
+        """原地解密渠道的API密钥和代理密码"""
+        # 先做前缀判断：未加密的旧数据直接使用，不进入解密函数
+        targets = []
+        for channel in channels:
+            for field in ('api_key', 'proxy_password'):
+                value = channel[field]
+                if not value:
+                    continue
+                if value.startswith(_ENCRYPTED_PREFIX):
+                    targets.append((channel, field))
+                elif not self._plaintext_key_warned:
+                    self._plaintext_key_warned = True
+                    logger.warning("Found unencrypted channel secrets, consider re-saving them to encrypt")
+        if targets:
+            decrypted = _encryption().decrypt_many([channel[field] for channel, field in targets])
+            for (channel, field), value in zip(targets, decrypted):
+                channel[field] = value
+    
+    def _get_cached_channel(self, cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]", key: str) -> Optional[Dict[str, Any]]:
+        """读取渠道缓存，未命中或已过期返回None（返回副本，调用方修改不影响缓存）"""
+        if not self._channel_cache_enabled:
+            return None
+        with self._channel_cache_lock:
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del cache[key]
+                return None
+            cache.move_to_end(key)
+            return dict(entry[1])
+    
+    def _cache_channel(self, cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]", key: str,
+                       channel: Dict[str, Any], generation: int):
+        """写入渠道缓存，超出容量时淘汰最久未使用的条目
+        
+        generation为查库前读取的缓存代数，期间有渠道写入时不缓存，避免旧数据在清空后被写回。
+        """
+        if not self._channel_cache_enabled:
+            return
+        with self._channel_cache_lock:
+            if generation != self._channel_cache_generation:
+                return
+            cache[key] = (time.monotonic() + CHANNEL_CACHE_TTL, dict(channel))
+            cache.move_to_end(key)
+            if len(cache) > CHANNEL_CACHE_MAXSIZE:
+                cache.popitem(last=False)
+    
+    def _invalidate_channel_cache(self):
+        """渠道有写入时清空缓存（写操作很少，整体清空最简单可靠），需在写入提交后调用"""
+        with self._channel_cache_lock:
+            self._channel_cache_generation += 1
+            self._channel_cache_by_key.clear()
+            self._channel_cache_by_id.clear()
+    
     def add_channel(
         self,
         name: str,
@@ -281,39 +662,17 @@ class DatabaseManager:
         proxy_password: Optional[str] = None
     ) -> str:
         """添加新渠道"""
-        channel_id = str(uuid.uuid4())
-        now = datetime.now().isoformat()
+        channel_id, params = self._channel_insert_params(
+            name, provider, base_url, api_key, custom_key, timeout, max_retries, models_mapping,
+            use_proxy, proxy_type, proxy_host, proxy_port, proxy_username, proxy_password
+        )
         
-        models_mapping_json = json.dumps(models_mapping) if models_mapping else None
-        
-        # 验证API密钥不是明显的JavaScript错误信息
-        if api_key.startswith('script.js:') or 'Uncaught TypeError' in api_key:
-            logger.error(f"Rejecting JavaScript error message as API key: {api_key[:50]}...")
-            raise ValueError("Invalid API key: JavaScript error message detected")
-        
-        # 加密API密钥
-        encrypted_api_key = encryption_manager.encrypt_api_key(api_key)
-        
-        # 加密代理密码（如果存在）
-        encrypted_proxy_password = None
-        if proxy_password:
-            encrypted_proxy_password = encryption_manager.encrypt_api_key(proxy_password)
-        
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             try:
-                cursor = self._execute_query(conn, '''
-                    INSERT INTO channels 
-                    (id, name, provider, base_url, api_key, custom_key, timeout, max_retries, 
-                     enabled, models_mapping, use_proxy, proxy_type, proxy_host, proxy_port, 
-                     proxy_username, proxy_password, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    channel_id, name, provider, base_url, encrypted_api_key, custom_key,
-                    timeout, max_retries, True, models_mapping_json, use_proxy, proxy_type,
-                    proxy_host, proxy_port, proxy_username, encrypted_proxy_password, now, now
-                ))
+                cursor = self._execute_query(conn, _INSERT_CHANNEL_SQL[self.db_type], params)
                 
                 conn.commit()
+                self._note_api_key_written(params[4])
                 logger.info(f"Added new channel: {name} ({provider}) with ID: {channel_id}")
                 return channel_id
             except (sqlite3.IntegrityError, pymysql.IntegrityError) as e:
@@ -321,6 +680,81 @@ class DatabaseManager:
                     raise ValueError(f"Custom key '{custom_key}' already exists")
                 raise ValueError(f"Database integrity error: {e}")
     
+    def add_channels_bulk(self, channels: List[Dict[str, Any]]) -> List[str]:
+        """批量添加渠道：一个事务内executemany写入，全部成功或全部回滚
+        
+        每个字典的键与add_channel的参数相同，返回新渠道ID列表。
+        """
+        if not channels:
+            return []
+        
+        custom_keys = [channel["custom_key"] for channel in channels]
+        duplicated = sorted({key for key in custom_keys if custom_keys.count(key) > 1})
+        if duplicated:
+            raise ValueError(f"Duplicate custom keys in batch: {', '.join(duplicated)}")
+        
+        channel_ids = []
+        params_seq = []
+        for channel in channels:
+            channel_id, params = self._channel_insert_params(**channel)
+            channel_ids.append(channel_id)
+            params_seq.append(params)
+        
+        with self.get_connection(write=True) as conn:
+            try:
+                self._execute_many(conn, _INSERT_CHANNEL_SQL[self.db_type], params_seq)
+                conn.commit()
+                self._note_api_key_written(params_seq[0][4])
+            except (sqlite3.IntegrityError, pymysql.IntegrityError) as e:
+                if "custom_key" in str(e):
+                    conn.rollback()
+                    placeholders = ", ".join("?" * len(custom_keys))
+                    cursor = self._execute_query(conn,
+                        f"SELECT custom_key FROM channels WHERE custom_key IN ({placeholders})",
+                        tuple(custom_keys), tuple_rows=True
+                    )
+                    existing = ", ".join(row[0] for row in cursor.fetchall())
+                    raise ValueError(f"Custom keys already exist: {existing}")
+                raise ValueError(f"Database integrity error: {e}")
+        
+        logger.info(f"Added {len(channel_ids)} channels in bulk")
+        return channel_ids
+    
+    def _channel_insert_params(
+        self,
+        name: str,
+        provider: str,
+        base_url: str,
+        api_key: str,
+        custom_key: str,
+        timeout: int = 30,
+        max_retries: int = 3,
+        models_mapping: Optional[Dict[str, str]] = None,
+        use_proxy: bool = False,
+        proxy_type: Optional[str] = None,
+        proxy_host: Optional[str] = None,
+        proxy_port: Optional[int] = None,
+        proxy_username: Optional[str] = None,
+        proxy_password: Optional[str] = None
+    ) -> Tuple[str, tuple]:
+        """校验并加密渠道字段，返回 (渠道ID, INSERT参数)"""
+        _validate_api_key(api_key)
+        
+        # 128位随机十六进制ID：无需构造UUID对象再格式化
+        channel_id = secrets.token_hex(16)
+        models_mapping_json = json.dumps(models_mapping) if models_mapping else None
+        
+        # 一次调用加密API密钥和代理密码（代理密码为空时存NULL）
+        encrypted_api_key, encrypted_proxy_password = _encryption().encrypt_many(
+            (api_key or "", proxy_password or None)
+        )
+        
+        return channel_id, (
+            channel_id, name, provider, base_url, encrypted_api_key, custom_key,
+            timeout, max_retries, True, models_mapping_json, use_proxy, proxy_type,
+            proxy_host, proxy_port, proxy_username, encrypted_proxy_password
+        )
+    
     def update_channel(
         self,
         channel_id: str,
@@ -339,81 +773,37 @@ class DatabaseManager:
         proxy_username: Optional[str] = None,
         proxy_password: Optional[str] = None
     ) -> bool:
-        """更新渠道信息"""
-        updates = []
-        params = []
-        
-        if name is not None:
-            updates.append("name = ?")
-            params.append(name)
-        if base_url is not None:
-            updates.append("base_url = ?")
-            params.append(base_url)
-        if api_key is not None:
-            # 验证API密钥不是明显的JavaScript错误信息
-            if api_key.startswith('script.js:') or 'Uncaught TypeError' in api_key:
-                logger.error(f"Rejecting JavaScript error message as API key: {api_key[:50]}...")
-                raise ValueError("Invalid API key: JavaScript error message detected")
-            
-            updates.append("api_key = ?")
-            # 加密API密钥
-            encrypted_api_key = encryption_manager.encrypt_api_key(api_key)
-            params.append(encrypted_api_key)
-        if custom_key is not None:
-            updates.append("custom_key = ?")
-            params.append(custom_key)
-        if timeout is not None:
-            updates.append("timeout = ?")
-            params.append(timeout)
-        if max_retries is not None:
-            updates.append("max_retries = ?")
-            params.append(max_retries)
-        if enabled is not None:
-            updates.append("enabled = ?")
-            params.append(enabled)
-        if models_mapping is not None:
-            updates.append("models_mapping = ?")
-            params.append(json.dumps(models_mapping))
-        if use_proxy is not None:
-            updates.append("use_proxy = ?")
-            params.append(use_proxy)
-        if proxy_type is not None:
-            updates.append("proxy_type = ?")
-            params.append(proxy_type)
-        if proxy_host is not None:
-            updates.append("proxy_host = ?")
-            params.append(proxy_host)
-        if proxy_port is not None:
-            updates.append("proxy_port = ?")
-            params.append(proxy_port)
-        if proxy_username is not None:
-            updates.append("proxy_username = ?")
-            params.append(proxy_username)
-        if proxy_password is not None:
-            updates.append("proxy_password = ?")
-            # 加密代理密码
-            encrypted_proxy_password = encryption_manager.encrypt_api_key(proxy_password)
-            params.append(encrypted_proxy_password)
-        
-        if not updates:
+        """更新渠道信息（参数为None的字段保持不变）"""
+        if all(value is None for value in (
+            name, base_url, api_key, custom_key, timeout, max_retries, enabled, models_mapping,
+            use_proxy, proxy_type, proxy_host, proxy_port, proxy_username, proxy_password
+        )):
             return False
         
-        updates.append("updated_at = ?")
-        params.append(datetime.now().isoformat())
-        params.append(channel_id)
+        if api_key is not None:
+            _validate_api_key(api_key)
+        # 加密API密钥和代理密码（None保持为None，即不修改）
+        encrypted_api_key, encrypted_proxy_password = _encryption().encrypt_many((api_key, proxy_password))
+        models_mapping_json = json.dumps(models_mapping) if models_mapping is not None else None
+        
+        # 顺序与_UPDATABLE_CHANNEL_FIELDS一致，最后是WHERE id
+        params = (
+            name, base_url, encrypted_api_key, custom_key, timeout, max_retries, enabled,
+            models_mapping_json, use_proxy, proxy_type, proxy_host, proxy_port, proxy_username,
+            encrypted_proxy_password, channel_id
+        )
         
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             try:
-                cursor = self._execute_query(conn, f'''
-                    UPDATE channels 
-                    SET {", ".join(updates)}
-                    WHERE id = ?
-                ''', tuple(params))
+                cursor = self._execute_query(conn, _UPDATE_CHANNEL_SQL[self.db_type], params)
                 
                 if cursor.rowcount == 0:
                     return False
                 
                 conn.commit()
+                self._invalidate_channel_cache()
+                if encrypted_api_key is not None:
+                    self._note_api_key_written(encrypted_api_key)
                 logger.info(f"Updated channel: {channel_id}")
                 return True
             except (sqlite3.IntegrityError, pymysql.IntegrityError) as e:
@@ -423,148 +813,110 @@ class DatabaseManager:
     
     def delete_channel(self, channel_id: str) -> bool:
         """删除渠道"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             cursor = self._execute_query(conn, "DELETE FROM channels WHERE id = ?", (channel_id,))
             if cursor.rowcount == 0:
                 return False
             
             conn.commit()
+            self._invalidate_channel_cache()
+            # 删除可能移除最后一个加密密钥，下次查询时重新计算
+            self._encrypted_keys_known = None
             logger.info(f"Deleted channel: {channel_id}")
             return True
     
     def get_channel(self, channel_id: str) -> Optional[Dict[str, Any]]:
         """获取渠道信息"""
+        cached = self._get_cached_channel(self._channel_cache_by_id, channel_id)
+        if cached is not None:
+            return cached
+        
+        generation = self._channel_cache_generation
         with self.get_connection() as conn:
-            cursor = self._execute_query(conn, "SELECT * FROM channels WHERE id = ?", (channel_id,))
+            cursor = self._execute_query(conn, f"{_CHANNEL_SELECT} WHERE id = ?", (channel_id,), tuple_rows=True)
             row = cursor.fetchone()
             
             if row:
-                channel = dict(row)
-                if channel['models_mapping']:
-                    channel['models_mapping'] = json.loads(channel['models_mapping'])
-                # 解密API密钥
-                if channel['api_key']:
-                    channel['api_key'] = encryption_manager.decrypt_api_key(channel['api_key'])
-                # 解密代理密码
-                if channel.get('proxy_password'):
-                    channel['proxy_password'] = encryption_manager.decrypt_api_key(channel['proxy_password'])
+                channel = self._row_to_channel(row)
+                self._cache_channel(self._channel_cache_by_id, channel_id, channel, generation)
                 return channel
             return None
     
     def get_channel_by_custom_key(self, custom_key: str) -> Optional[Dict[str, Any]]:
         """根据自定义key获取渠道信息"""
+        cached = self._get_cached_channel(self._channel_cache_by_key, custom_key)
+        if cached is not None:
+            return cached
+        
+        generation = self._channel_cache_generation
         with self.get_connection() as conn:
             cursor = self._execute_query(conn, 
-                "SELECT * FROM channels WHERE custom_key = ? AND enabled = 1", 
-                (custom_key,)
+                f"{_CHANNEL_SELECT} WHERE custom_key = ? AND enabled = 1", 
+                (custom_key,),
+                tuple_rows=True
             )
             row = cursor.fetchone()
             
             if row:
-                channel = dict(row)
-                if channel['models_mapping']:
-                    channel['models_mapping'] = json.loads(channel['models_mapping'])
-                # 解密API密钥
-                if channel['api_key']:
-                    channel['api_key'] = encryption_manager.decrypt_api_key(channel['api_key'])
-                # 解密代理密码
-                if channel.get('proxy_password'):
-                    channel['proxy_password'] = encryption_manager.decrypt_api_key(channel['proxy_password'])
+                channel = self._row_to_channel(row)
+                self._cache_channel(self._channel_cache_by_key, custom_key, channel, generation)
                 return channel
             return None
     
-    def get_all_channels(self) -> List[Dict[str, Any]]:
-        """获取所有渠道"""
+    async def aget_channel_by_custom_key(self, custom_key: str) -> Optional[Dict[str, Any]]:
+        """get_channel_by_custom_key的异步版本：缓存命中直接返回，未命中时在线程中查询，不阻塞事件循环"""
+        cached = self._get_cached_channel(self._channel_cache_by_key, custom_key)
+        if cached is not None:
+            return cached
+        return await asyncio.to_thread(self.get_channel_by_custom_key, custom_key)
+    
+    def get_all_channels(self, include_keys: bool = True) -> List[Dict[str, Any]]:
+        """获取所有渠道（include_keys=False时不解密，api_key/proxy_password保持密文）"""
         with self.get_connection() as conn:
-            cursor = self._execute_query(conn, "SELECT * FROM channels ORDER BY created_at DESC")
-            channels = []
-            for row in cursor.fetchall():
-                channel = dict(row)
-                if channel['models_mapping']:
-                    channel['models_mapping'] = json.loads(channel['models_mapping'])
-                # 解密API密钥
-                if channel['api_key']:
-                    channel['api_key'] = encryption_manager.decrypt_api_key(channel['api_key'])
-                # 解密代理密码
-                if channel.get('proxy_password'):
-                    channel['proxy_password'] = encryption_manager.decrypt_api_key(channel['proxy_password'])
-                channels.append(channel)
-            return channels
-    
-    def get_enabled_channels(self) -> List[Dict[str, Any]]:
-        """获取所有启用的渠道"""
+            cursor = self._execute_query(conn, f"{_CHANNEL_SELECT} ORDER BY created_at DESC", tuple_rows=True)
+            return self._rows_to_channels(cursor.fetchall(), include_keys)
+    
+    def get_enabled_channels(self, include_keys: bool = True) -> List[Dict[str, Any]]:
+        """获取所有启用的渠道（include_keys=False时不解密，api_key/proxy_password保持密文）"""
         with self.get_connection() as conn:
-            cursor = self._execute_query(conn, "SELECT * FROM channels WHERE enabled = 1 ORDER BY created_at DESC")
-            channels = []
-            for row in cursor.fetchall():
-                channel = dict(row)
-                if channel['models_mapping']:
-                    channel['models_mapping'] = json.loads(channel['models_mapping'])
-                # 解密API密钥
-                if channel['api_key']:
-                    channel['api_key'] = encryption_manager.decrypt_api_key(channel['api_key'])
-                # 解密代理密码
-                if channel.get('proxy_password'):
-                    channel['proxy_password'] = encryption_manager.decrypt_api_key(channel['proxy_password'])
-                channels.append(channel)
-            return channels
-    
-    def get_channels_by_provider(self, provider: str) -> List[Dict[str, Any]]:
-        """按提供商获取渠道列表"""
+            cursor = self._execute_query(conn, f"{_CHANNEL_SELECT} WHERE enabled = 1 ORDER BY created_at DESC", tuple_rows=True)
+            return self._rows_to_channels(cursor.fetchall(), include_keys)
+    
+    def get_channels_by_provider(self, provider: str, include_keys: bool = True) -> List[Dict[str, Any]]:
+        """按提供商获取渠道列表（include_keys=False时不解密，api_key/proxy_password保持密文）"""
         with self.get_connection() as conn:
             cursor = self._execute_query(conn,
-                "SELECT * FROM channels WHERE provider = ? AND enabled = 1 ORDER BY created_at DESC", 
-                (provider,)
+                f"{_CHANNEL_SELECT} WHERE provider = ? AND enabled = 1 ORDER BY created_at DESC", 
+                (provider,),
+                tuple_rows=True
             )
-            channels = []
-            for row in cursor.fetchall():
-                channel = dict(row)
-                if channel['models_mapping']:
-                    channel['models_mapping'] = json.loads(channel['models_mapping'])
-                # 解密API密钥
-                if channel['api_key']:
-                    channel['api_key'] = encryption_manager.decrypt_api_key(channel['api_key'])
-                # 解密代理密码
-                if channel.get('proxy_password'):
-                    channel['proxy_password'] = encryption_manager.decrypt_api_key(channel['proxy_password'])
-                channels.append(channel)
-            return channels
+            return self._rows_to_channels(cursor.fetchall(), include_keys)
     
     def set_config(self, key: str, value: str):
         """设置系统配置"""
-        now = datetime.now().isoformat()
+        with self.get_connection(write=True) as conn:
+            self._execute_query(conn, _SET_CONFIG_SQL[self.db_type], (key, value))
+            conn.commit()
+    
+    def set_configs(self, items: Dict[str, str]):
+        """批量设置系统配置：一个事务内executemany写入"""
+        if not items:
+            return
         
-        with self.get_connection() as conn:
-            if self.db_type == "sqlite":
-                cursor = self._execute_query(conn, '''
-                    INSERT OR REPLACE INTO system_config (key, value, created_at, updated_at)
-                    VALUES (?, ?, 
-                        COALESCE((SELECT created_at FROM system_config WHERE key = ?), ?),
-                        ?)
-                ''', (key, value, key, now, now))
-            elif self.db_type == "mysql":
-                cursor = self._execute_query(conn, '''
-                    INSERT INTO system_config (`key`, `value`, created_at, updated_at)
-                    VALUES (?, ?, ?, ?)
-                    ON DUPLICATE KEY UPDATE
-                    `value` = VALUES(`value`),
-                    updated_at = VALUES(updated_at)
-                ''', (key, value, now, now))
+        with self.get_connection(write=True) as conn:
+            self._execute_many(conn, _SET_CONFIG_SQL[self.db_type], list(items.items()))
             conn.commit()
     
     def get_config(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """获取系统配置"""
         with self.get_connection() as conn:
-            if self.db_type == "sqlite":
-                cursor = self._execute_query(conn, "SELECT value FROM system_config WHERE key = ?", (key,))
-            elif self.db_type == "mysql":
-                cursor = self._execute_query(conn, "SELECT `value` FROM system_config WHERE `key` = ?", (key,))
+            cursor = self._execute_query(conn, _GET_CONFIG_SQL[self.db_type], (key,))
             row = cursor.fetchone()
             return row['value'] if row else default
     
     def delete_config(self, key: str) -> bool:
         """删除系统配置"""
-        with self.get_connection() as conn:
+        with self.get_connection(write=True) as conn:
             if self.db_type == "sqlite":
                 cursor = self._execute_query(conn, "DELETE FROM system_config WHERE key = ?", (key,))
             elif self.db_type == "mysql":
@@ -577,8 +929,8 @@ class DatabaseManager:
         with self.get_connection() as conn:
             if self.db_type == "sqlite":
                 cursor = self._execute_query(conn,
-                    "SELECT key, value FROM system_config WHERE key LIKE ?", 
-                    (f"{prefix}%",)
+                    "SELECT key, value FROM system_config WHERE key >= ? AND key < ?", 
+                    _prefix_range(prefix)
                 )
             elif self.db_type == "mysql":
                 cursor = self._execute_query(conn,
@@ -588,20 +940,70 @@ class DatabaseManager:
             results = cursor.fetchall()
             return [{"key": row["key"], "value": row["value"]} for row in results]
     
+    def delete_configs_by_prefix(self, prefix: str) -> int:
+        """删除指定前缀的所有配置，单条语句完成，返回删除行数"""
+        with self.get_connection(write=True) as conn:
+            if self.db_type == "sqlite":
+                cursor = self._execute_query(conn,
+                    "DELETE FROM system_config WHERE key >= ? AND key < ?",
+                    _prefix_range(prefix)
+                )
+            elif self.db_type == "mysql":
+                cursor = self._execute_query(conn,
+                    "DELETE FROM system_config WHERE `key` LIKE ?",
+                    (f"{prefix}%",)
+                )
+            conn.commit()
+            return cursor.rowcount
+    
+    def delete_expired_configs(self, prefix: str, now: int) -> int:
+        """删除指定前缀、值为epoch秒且早于now的配置，单条语句完成，返回删除行数"""
+        with self.get_connection(write=True) as conn:
+            if self.db_type == "sqlite":
+                cursor = self._execute_query(conn,
+                    "DELETE FROM system_config WHERE key >= ? AND key < ? AND CAST(value AS INTEGER) < ?",
+                    (*_prefix_range(prefix), now)
+                )
+            elif self.db_type == "mysql":
+                # 严格模式下对非数字值CAST会报错（1292）导致整条DELETE失败；
+                # CASE只对纯数字值做CAST，非数字值与SQLite（CAST结果为0）一致视为已过期
+                cursor = self._execute_query(conn,
+                    "DELETE FROM system_config WHERE `key` LIKE ? AND "
+                    "CASE WHEN `value` REGEXP '^[0-9]+$' THEN CAST(`value` AS UNSIGNED) < ? ELSE TRUE END",
+                    (f"{prefix}%", now)
+                )
+            conn.commit()
+            return cursor.rowcount
+    
     def has_encrypted_api_keys(self) -> bool:
-        """检查数据库中是否存在加密的API密钥"""
+        """检查数据库中是否存在加密的API密钥（结果缓存，写入加密密钥时直接置为True）"""
+        if self._encrypted_keys_known is not None:
+            return self._encrypted_keys_known
         try:
             with self.get_connection() as conn:
-                cursor = self._execute_query(conn,
-                    "SELECT COUNT(*) as count FROM channels WHERE api_key LIKE ?"
-                    , ("encrypted:%",)
-                )
-                row = cursor.fetchone()
-                return row['count'] > 0 if row else False
+                # LIMIT 1：找到第一条匹配即停止，无需统计全表；
+                # SQLite用范围比较代替LIKE（大小写敏感，逐行比较更便宜）
+                if self.db_type == "sqlite":
+                    cursor = self._execute_query(conn,
+                        "SELECT 1 FROM channels WHERE api_key >= ? AND api_key < ? LIMIT 1",
+                        _prefix_range(_ENCRYPTED_PREFIX), tuple_rows=True
+                    )
+                else:
+                    cursor = self._execute_query(conn,
+                        "SELECT 1 FROM channels WHERE api_key LIKE ? LIMIT 1",
+                        (f"{_ENCRYPTED_PREFIX}%",), tuple_rows=True
+                    )
+                self._encrypted_keys_known = cursor.fetchone() is not None
+                return self._encrypted_keys_known
         except Exception:
-            # 如果表不存在或查询失败，返回False
+            # 如果表不存在或查询失败，返回False（不缓存，下次重试）
             return False
     
+    def _note_api_key_written(self, stored_api_key: str):
+        """写入API密钥后更新has_encrypted_api_keys的缓存"""
+        if stored_api_key.startswith(_ENCRYPTED_PREFIX):
+            self._encrypted_keys_known = True
+    
 
 
 
@@ -4,25 +4,75 @@ API密钥加密工具
 """
 import os
 import base64
-import secrets
-from typing import Optional, Tuple
+import functools
+from typing import Iterable, List, Optional
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 from src.utils.logger import setup_logger
 from src.utils.env_config import env_config
 
 logger = setup_logger("encryption")
 
+try:
+    # 可选依赖：Rust实现的Fernet，令牌格式与cryptography完全兼容，短数据加解密快数倍
+    from rfernet import Fernet as _RFernet
+except ImportError:
+    _RFernet = None
+
+# 解密结果缓存的条目上限：同一密文总是解密为同一明文，命中时省去一次AES+HMAC校验；
+# 缓存内容为明文密钥，仅保存在进程内存中
+DECRYPT_CACHE_SIZE = 1024
+
+# 加密值的存储前缀（判断前缀用str.startswith：C实现，比长度检查+切片比较更快）
+_ENCRYPTED_PREFIX = "encrypted:"
+_ENCRYPTED_PREFIX_LEN = len(_ENCRYPTED_PREFIX)
+
+# Fernet令牌以版本字节0x80开头，其后是高位为0的时间戳，编码后固定以此开头；
+# 旧版数据对令牌再做了一次base64，编码后以"Z0FBQUFB"开头，据此区分两种格式
+_FERNET_TOKEN_PREFIX = b"gAAAAA"
+
+
+class _RFernetAdapter:
+    """把rfernet的接口适配为cryptography的形式：encrypt返回ASCII字节，decrypt接受字节
+    
+    rfernet的encrypt(bytes)返回str、decrypt只接受str令牌，与cryptography不同。
+    """
+    __slots__ = ("_fernet",)
+    
+    def __init__(self, key: str):
+        self._fernet = _RFernet(key)
+    
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data).encode("ascii")
+    
+    def decrypt(self, token: bytes) -> bytes:
+        return self._fernet.decrypt(token.decode("ascii"))
+
+
+def _make_fernet(key: str):
+    """创建Fernet实例，安装了rfernet且与cryptography互通时优先使用"""
+    fernet = Fernet(key.encode())
+    if _RFernet is not None:
+        try:
+            rfernet = _RFernetAdapter(key)
+            # 自检：两种实现的令牌必须能互相解密，否则回退到cryptography
+            probe = b"rfernet-check"
+            if fernet.decrypt(rfernet.encrypt(probe)) == probe and rfernet.decrypt(fernet.encrypt(probe)) == probe:
+                return rfernet
+            logger.warning("rfernet is not compatible with cryptography, falling back to cryptography")
+        except Exception as e:
+            logger.warning(f"rfernet self-check failed, falling back to cryptography: {e}")
+    return fernet
+
 
 class APIKeyEncryption:
     """API密钥加密管理器"""
     
     def __init__(self):
         self._fernet = None
+        # 按实例缓存，轮换密钥时随clear_cache()一起清空
+        self._decrypt_token = functools.lru_cache(maxsize=DECRYPT_CACHE_SIZE)(self._decrypt_token_uncached)
         # 获取数据库类型
-        from src.utils.env_config import env_config
         self.db_type = env_config.database_type
         self._init_encryption_key()
     
@@ -38,7 +88,7 @@ class APIKeyEncryption:
         
         # 3. 验证密钥格式
         try:
-            self._fernet = Fernet(encryption_key.encode())
+            self._fernet = _make_fernet(encryption_key)
             logger.info("Encryption system initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize encryption: {e}")
@@ -68,10 +118,15 @@ class APIKeyEncryption:
             raise ValueError(f"Unsupported database type: {self.db_type}")
     
     def _sqlite_key_operations(self) -> str:
-        """SQLite密钥操作"""
+        """SQLite密钥操作（已有密钥时只需一次查询）"""
         import sqlite3
         db_path = env_config.database_path
         
+        if db_path.startswith((":memory:", "file::memory:")):
+            # 内存库（测试/CI用）随进程销毁，其中的密文不会跨进程存在，使用进程内密钥即可
+            logger.info("Using in-memory encryption key for in-memory SQLite database")
+            return self._generate_encryption_key()
+        
         # 确保数据库目录存在
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
@@ -79,7 +134,17 @@ class APIKeyEncryption:
         try:
             cursor = conn.cursor()
             
-            # 创建配置表（如果不存在）
+            # 常见情况：密钥已存储，直接读取（配置表不存在时按未存储处理）
+            try:
+                cursor.execute('SELECT value FROM config WHERE key = ?', ('encryption_key',))
+                row = cursor.fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            if row:
+                logger.info("Using stored encryption key from database")
+                return row[0]
+            
+            # 首次启动：创建配置表（如果不存在）
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS config (
                     key TEXT PRIMARY KEY,
@@ -89,65 +154,54 @@ class APIKeyEncryption:
                 )
             ''')
             
-            # 检查是否已有加密密钥
-            cursor.execute('SELECT value FROM config WHERE key = ?', ('encryption_key',))
-            row = cursor.fetchone()
+            # 检查是否有加密数据（channels表不存在即没有）
+            try:
+                # 前缀范围比较（"encrypted;"为"encrypted:"的下一个前缀），找到一条即停止
+                cursor.execute("SELECT 1 FROM channels WHERE api_key >= 'encrypted:' AND api_key < 'encrypted;' LIMIT 1")
+                has_encrypted_data = cursor.fetchone() is not None
+            except sqlite3.OperationalError:
+                has_encrypted_data = False
+            if has_encrypted_data:
+                raise ValueError("Found encrypted API keys but no encryption key stored")
             
-            if row:
+            # 生成并存储新密钥；其他进程同时启动并已写入时保留其密钥
+            encryption_key = self._generate_encryption_key()
+            cursor.execute(
+                'INSERT OR IGNORE INTO config (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
+                ('encryption_key', encryption_key)
+            )
+            conn.commit()
+            if cursor.rowcount != 1:
+                cursor.execute('SELECT value FROM config WHERE key = ?', ('encryption_key',))
                 logger.info("Using stored encryption key from database")
-                return row[0]
-            else:
-                # 检查是否有加密数据
-                cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='channels'")
-                if cursor.fetchone()[0] > 0:
-                    cursor.execute("SELECT COUNT(*) FROM channels WHERE api_key LIKE 'encrypted:%'")
-                    has_encrypted_data = cursor.fetchone()[0] > 0
-                    
-                    if has_encrypted_data:
-                        raise ValueError("Found encrypted API keys but no encryption key stored")
-                
-                # 生成并存储新密钥
-                encryption_key = self._generate_encryption_key()
-                cursor.execute(
-                    'INSERT INTO config (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)',
-                    ('encryption_key', encryption_key)
-                )
-                conn.commit()
-                logger.info("Generated new encryption key and stored in database")
-                logger.info("For better security, consider moving this to .env file:")
-                logger.info(f"ENCRYPTION_KEY={encryption_key}")
-                return encryption_key
+                return cursor.fetchone()[0]
+            
+            self._log_generated_key(encryption_key)
+            return encryption_key
                 
         finally:
             conn.close()
     
     def _mysql_key_operations(self) -> str:
-        """MySQL密钥操作"""
+        """MySQL密钥操作（已有密钥时只需一次查询）"""
         import pymysql
+        from src.utils.database import db_manager
         
-        connect_params = {
-            'host': env_config.mysql_host,
-            'port': env_config.mysql_port,
-            'user': env_config.mysql_user,
-            'password': env_config.mysql_password,
-            'database': env_config.mysql_database,
-            'charset': 'utf8mb4',
-            'connect_timeout': 5,
-            'read_timeout': 10,
-            'write_timeout': 10,
-            'ssl_disabled': False
-        }
-        
-        if env_config.mysql_socket:
-            connect_params['unix_socket'] = env_config.mysql_socket
-            connect_params.pop('host', None)
-            connect_params.pop('port', None)
-        
-        conn = pymysql.connect(**connect_params)
-        try:
+        # 复用DatabaseManager的MySQL连接池（语句自动提交），不再单独建立连接
+        with db_manager.get_connection() as conn:
             cursor = conn.cursor(pymysql.cursors.DictCursor)
             
-            # 创建配置表（如果不存在）
+            # 常见情况：密钥已存储，直接读取（配置表不存在时按未存储处理）
+            try:
+                cursor.execute('SELECT `value` FROM config WHERE `key` = %s', ('encryption_key',))
+                row = cursor.fetchone()
+            except pymysql.err.ProgrammingError:
+                row = None
+            if row:
+                logger.info("Using stored encryption key from database")
+                return row['value']
+            
+            # 首次启动：创建配置表（如果不存在）
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS config (
                     `key` VARCHAR(255) PRIMARY KEY,
@@ -157,40 +211,35 @@ class APIKeyEncryption:
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             ''')
             
-            # 检查是否已有加密密钥
-            cursor.execute('SELECT `value` FROM config WHERE `key` = %s', ('encryption_key',))
-            row = cursor.fetchone()
+            # 检查是否有加密数据（channels表不存在即没有）
+            try:
+                cursor.execute("SELECT 1 FROM channels WHERE api_key LIKE %s LIMIT 1", ("encrypted:%",))
+                has_encrypted_data = cursor.fetchone() is not None
+            except pymysql.err.ProgrammingError:
+                has_encrypted_data = False
+            if has_encrypted_data:
+                raise ValueError("Found encrypted API keys but no encryption key stored")
             
-            if row:
+            # 生成并存储新密钥；其他进程同时启动并已写入时保留其密钥（受影响行数为0）
+            encryption_key = self._generate_encryption_key()
+            cursor.execute(
+                'INSERT IGNORE INTO config (`key`, `value`, updated_at) VALUES (%s, %s, CURRENT_TIMESTAMP)',
+                ('encryption_key', encryption_key)
+            )
+            conn.commit()
+            if cursor.rowcount != 1:
+                cursor.execute('SELECT `value` FROM config WHERE `key` = %s', ('encryption_key',))
                 logger.info("Using stored encryption key from database")
-                return row['value']
-            else:
-                # 检查是否有加密数据
-                cursor.execute("SHOW TABLES LIKE 'channels'")
-                if cursor.fetchone():
-                    cursor.execute("SELECT COUNT(*) as count FROM channels WHERE api_key LIKE %s", ("encrypted:%",))
-                    has_encrypted_data = cursor.fetchone()['count'] > 0
-                    
-                    if has_encrypted_data:
-                        raise ValueError("Found encrypted API keys but no encryption key stored")
-                
-                # 生成并存储新密钥
-                encryption_key = self._generate_encryption_key()
-                cursor.execute('''
-                    INSERT INTO config (`key`, `value`, updated_at) 
-                    VALUES (%s, %s, CURRENT_TIMESTAMP)
-                    ON DUPLICATE KEY UPDATE
-                    `value` = VALUES(`value`),
-                    updated_at = VALUES(updated_at)
-                ''', ('encryption_key', encryption_key))
-                conn.commit()
-                logger.info("Generated new encryption key and stored in database")
-                logger.info("For better security, consider moving this to .env file:")
-                logger.info(f"ENCRYPTION_KEY={encryption_key}")
-                return encryption_key
-                
-        finally:
-            conn.close()
+                return cursor.fetchone()['value']
+            
+            self._log_generated_key(encryption_key)
+            return encryption_key
+    
+    def _log_generated_key(self, encryption_key: str):
+        """记录新生成并已存入数据库的密钥"""
+        logger.info("Generated new encryption key and stored in database")
+        logger.info("For better security, consider moving this to .env file:")
+        logger.info(f"ENCRYPTION_KEY={encryption_key}")
     
     def _generate_encryption_key(self) -> str:
         """生成新的加密密钥"""
@@ -205,9 +254,20 @@ class APIKeyEncryption:
             return ""
         
         try:
-            encrypted_data = self._fernet.encrypt(api_key.encode())
-            # 返回base64编码的加密数据，添加前缀标识
-            return f"encrypted:{base64.b64encode(encrypted_data).decode()}"
+            # Fernet令牌本身就是URL安全的base64，直接加前缀存储
+            return _ENCRYPTED_PREFIX + self._fernet.encrypt(api_key.encode()).decode("ascii")
+        except Exception as e:
+            logger.error(f"Failed to encrypt API key: {e}")
+            raise ValueError("Encryption failed")
+    
+    def encrypt_many(self, values: Iterable[Optional[str]]) -> List[Optional[str]]:
+        """批量加密（同一行的多个密钥字段/批量导入），None保持为None，空字符串返回空字符串"""
+        encrypt = self._fernet.encrypt
+        try:
+            return [
+                value if not value else _ENCRYPTED_PREFIX + encrypt(value.encode()).decode("ascii")
+                for value in values
+            ]
         except Exception as e:
             logger.error(f"Failed to encrypt API key: {e}")
             raise ValueError("Encryption failed")
@@ -218,63 +278,91 @@ class APIKeyEncryption:
             return ""
         
         # 检查是否是加密格式
-        if not encrypted_api_key.startswith("encrypted:"):
+        if not encrypted_api_key.startswith(_ENCRYPTED_PREFIX):
             # 兼容未加密的旧数据
             logger.warning("Found unencrypted API key, consider re-saving to encrypt it")
             return encrypted_api_key
         
         try:
-            # 移除前缀并解码
-            encrypted_data = encrypted_api_key[10:]  # 移除 "encrypted:" 前缀
-            encrypted_bytes = base64.b64decode(encrypted_data.encode())
-            
-            # 解密
-            decrypted_data = self._fernet.decrypt(encrypted_bytes)
-            return decrypted_data.decode()
+            return self._decrypt_token(encrypted_api_key)
+        except Exception as e:
+            logger.error(f"Failed to decrypt API key: {e}")
+            raise ValueError("Decryption failed - possibly wrong encryption key")
+    
+    def decrypt_many(self, encrypted_values: Iterable[str]) -> List[str]:
+        """批量解密（启动加载/渠道列表），空值和未加密的旧数据原样返回"""
+        decrypt = self._decrypt_token
+        try:
+            return [
+                decrypt(value) if value and value.startswith(_ENCRYPTED_PREFIX) else value
+                for value in encrypted_values
+            ]
         except Exception as e:
             logger.error(f"Failed to decrypt API key: {e}")
             raise ValueError("Decryption failed - possibly wrong encryption key")
     
+    def _decrypt_token_uncached(self, encrypted_api_key: str) -> str:
+        """解密带前缀的密文（解密失败时抛出异常，异常结果不会被缓存）"""
+        token = encrypted_api_key[_ENCRYPTED_PREFIX_LEN:].encode("ascii")  # 移除前缀
+        if not token.startswith(_FERNET_TOKEN_PREFIX):
+            # 旧版格式在Fernet令牌外又包了一层base64
+            token = base64.b64decode(token)
+        return self._fernet.decrypt(token).decode()
+    
+    def clear_cache(self):
+        """清空解密结果缓存"""
+        self._decrypt_token.cache_clear()
+    
     def is_encrypted(self, data: str) -> bool:
         """检查数据是否已加密"""
-        return data.startswith("encrypted:") if data else False
+        return data.startswith(_ENCRYPTED_PREFIX) if data else False
     
     def rotate_encryption_key(self, new_key: str, old_encrypted_data: list) -> list:
         """
         轮换加密密钥（高级功能）
         重新加密所有数据使用新密钥
         """
-        # 保存当前密钥
-        old_fernet = self._fernet
-        
         try:
-            # 设置新密钥
-            self._fernet = Fernet(new_key.encode())
+            # 新密钥只创建一次；循环中用当前（旧）密钥解密、新密钥加密，
+            # 全部成功后才切换self._fernet，中途失败时当前密钥保持不变
+            new_fernet = _make_fernet(new_key)
             
             # 重新加密所有数据
             reencrypted_data = []
             for encrypted_item in old_encrypted_data:
                 if self.is_encrypted(encrypted_item):
-                    # 使用旧密钥解密
-                    self._fernet = old_fernet
                     decrypted = self.decrypt_api_key(encrypted_item)
-                    
-                    # 使用新密钥加密
-                    self._fernet = Fernet(new_key.encode())
-                    reencrypted = self.encrypt_api_key(decrypted)
-                    reencrypted_data.append(reencrypted)
+                    reencrypted_data.append(
+                        _ENCRYPTED_PREFIX + new_fernet.encrypt(decrypted.encode()).decode("ascii")
+                    )
                 else:
                     reencrypted_data.append(encrypted_item)
             
+            self._fernet = new_fernet
             logger.info(f"Successfully rotated encryption key for {len(reencrypted_data)} items")
             return reencrypted_data
             
         except Exception as e:
-            # 恢复旧密钥
-            self._fernet = old_fernet
             logger.error(f"Key rotation failed: {e}")
             raise
+        finally:
+            # 缓存的是旧密钥下密文的解密结果，轮换后不再保留
+            self.clear_cache()
+
+
+# 全局加密管理器实例（懒加载，首次加解密时才读取/生成密钥）
+_encryption_manager = None
+
+def get_encryption_manager() -> APIKeyEncryption:
+    """获取加密管理器实例"""
+    global _encryption_manager
+    if _encryption_manager is None:
+        _encryption_manager = APIKeyEncryption()
+    return _encryption_manager
 
+# 向后兼容的属性访问
+class _EncryptionManagerProxy:
+    def __getattr__(self, name):
+        return getattr(get_encryption_manager(), name)
 
-# 全局加密管理器实例
-encryption_manager = APIKeyEncryption()
\ No newline at end of file
+encryption_manager = _EncryptionManagerProxy()
\ No newline at end of file
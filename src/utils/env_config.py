@@ -2,10 +2,16 @@
 环境变量配置管理器
 统一管理所有环境变量配置
 """
+import functools
 import os
+import re
 from typing import Optional, Union, List
 from pathlib import Path
 
+# .env中的一行 KEY=VALUE：跳过空行和#开头的注释行，键和值两端的空白不计入
+# （[^\S\n]为不跨行的空白，兼容\r\n换行）
+_ENV_LINE_RE = re.compile(r'^[^\S\n]*([^\s#=][^=\n]*?)[^\S\n]*=[^\S\n]*(.*?)[^\S\n]*$', re.M)
+
 class EnvConfig:
     """环境变量配置管理器"""
     
@@ -13,22 +19,20 @@ class EnvConfig:
         self._load_env_file()
     
     def _load_env_file(self):
-        """加载.env文件"""
+        """加载.env文件（整个文件一次正则扫描）"""
         env_file = Path(".env")
         if env_file.exists():
-            with open(env_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        # 移除引号
-                        if value.startswith('"') and value.endswith('"'):
-                            value = value[1:-1]
-                        elif value.startswith("'") and value.endswith("'"):
-                            value = value[1:-1]
-                        os.environ[key] = value
+            values = {}
+            for key, value in _ENV_LINE_RE.findall(env_file.read_text(encoding='utf-8')):
+                # 移除成对的引号
+                if value[:1] in ('"', "'") and value.endswith(value[:1]):
+                    value = value[1:-1]
+                values[key] = value
+            os.environ.update(values)
+    
+    def refresh(self):
+        """清除已缓存的配置项，下次访问时重新读取环境变量（配置属性在首次访问后缓存）"""
+        self.__dict__.clear()
     
     def get_str(self, key: str, default: str = "") -> str:
         """获取字符串配置"""
@@ -66,7 +70,7 @@ class EnvConfig:
     # 管理员认证配置
     # ================================
     
-    @property
+    @functools.cached_property
     def admin_password(self) -> str:
         """管理员密码"""
         return self.get_str("ADMIN_PASSWORD", "admin123")
@@ -77,16 +81,21 @@ class EnvConfig:
     # Web服务器配置
     # ================================
 
-    @property
+    @functools.cached_property
     def web_port(self) -> int:
         """Web服务器端口"""
         return self.get_int("WEB_PORT", 3000)
+
+    @functools.cached_property
+    def multi_worker(self) -> bool:
+        """是否以多个工作进程运行（web_server.py --workers大于1时自动设置），此时关闭进程内的会话/渠道缓存"""
+        return self.get_bool("MULTI_WORKER", False)
     
     # ================================
     # AI服务商配置
     # ================================
     
-    @property
+    @functools.cached_property
     def anthropic_max_tokens(self) -> int:
         """Anthropic最大token数"""
         return self.get_int("ANTHROPIC_MAX_TOKENS", 4096)
@@ -97,42 +106,42 @@ class EnvConfig:
     # 数据库配置
     # ================================
 
-    @property
+    @functools.cached_property
     def database_type(self) -> str:
         """数据库类型 (sqlite|mysql)"""
         return self.get_str("DATABASE_TYPE", "sqlite").lower()
 
-    @property
+    @functools.cached_property
     def database_path(self) -> str:
         """数据库文件路径（SQLite使用）"""
         return self.get_str("DATABASE_PATH", "data/channels.db")
 
-    @property
+    @functools.cached_property
     def mysql_host(self) -> str:
         """MySQL主机地址"""
         return self.get_str("MYSQL_HOST", "localhost")
 
-    @property
+    @functools.cached_property
     def mysql_port(self) -> int:
         """MySQL端口"""
         return self.get_int("MYSQL_PORT", 3306)
 
-    @property
+    @functools.cached_property
     def mysql_user(self) -> str:
         """MySQL用户名"""
         return self.get_str("MYSQL_USER", "root")
 
-    @property
+    @functools.cached_property
     def mysql_password(self) -> str:
         """MySQL密码"""
         return self.get_str("MYSQL_PASSWORD", "")
 
-    @property
+    @functools.cached_property
     def mysql_database(self) -> str:
         """MySQL数据库名"""
         return self.get_str("MYSQL_DATABASE", "default_db")
 
-    @property
+    @functools.cached_property
     def mysql_socket(self) -> Optional[str]:
         """MySQL Socket路径（可选）"""
         socket_path = self.get_str("MYSQL_SOCKET", "")
@@ -142,22 +151,22 @@ class EnvConfig:
     # 日志配置
     # ================================
 
-    @property
+    @functools.cached_property
     def log_level(self) -> str:
         """日志级别"""
         return self.get_str("LOG_LEVEL", "WARNING")
 
-    @property
+    @functools.cached_property
     def debug_mode(self) -> bool:
         """是否启用调试模式"""
         return self.get_bool("DEBUG_MODE", False)
 
-    @property
+    @functools.cached_property
     def log_file(self) -> str:
         """日志文件路径"""
         return self.get_str("LOG_FILE", "logs/app.log")
 
-    @property
+    @functools.cached_property
     def log_max_days(self) -> int:
         """日志文件保留天数"""
         return self.get_int("LOG_MAX_DAYS", 1)
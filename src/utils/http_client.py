@@ -1,9 +1,14 @@
 """
 HTTP客户端工具，支持代理配置
 """
+import functools
+import http.cookiejar
 import httpx
-from typing import Dict, Any, Optional
+import importlib.util
+import operator
+from typing import Dict, Any, Optional, Tuple
 from contextlib import asynccontextmanager
+from urllib.parse import quote, urlunsplit
 
 from src.channels.channel_manager import ChannelInfo
 from src.utils.config import ChannelConfig
@@ -11,115 +16,120 @@ from src.utils.logger import setup_logger
 
 logger = setup_logger("http_client")
 
+# SOCKS5代理需要httpx[socks]（socksio），启动时检查一次
+_HAS_SOCKSIO = importlib.util.find_spec("socksio") is not None
 
-def create_proxy_config(channel_info: ChannelInfo) -> Optional[Dict[str, str]]:
-    """从渠道信息创建代理配置"""
-    if not getattr(channel_info, 'use_proxy', False):
-        logger.debug(f"Channel {channel_info.name}: Proxy disabled")
-        return None
-    
-    proxy_host = getattr(channel_info, 'proxy_host', None)
-    proxy_port = getattr(channel_info, 'proxy_port', None)
+# 共享客户端的连接池上限：保持长连接以复用TCP/TLS会话
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 50
+HTTP_MAX_CONNECTIONS = 200
+
+# (代理URL, 超时) -> 共享的AsyncClient，进程内复用，关闭时由aclose_http_clients()统一释放
+_clients: Dict[Tuple[Optional[str], float], httpx.AsyncClient] = {}
+
+
+class _RejectAllCookiesPolicy(http.cookiejar.DefaultCookiePolicy):
+    """拒绝保存任何响应Cookie"""
     
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _get_shared_client(proxy_config: Optional[str], timeout: float) -> httpx.AsyncClient:
+    """获取（必要时创建）与代理配置和超时对应的共享客户端"""
+    key = (proxy_config, timeout)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=timeout,
+            proxies=proxy_config,
+            # 共享客户端跨渠道、跨用户密钥复用，不能保存上游的Set-Cookie并在之后的请求中带出
+            cookies=http.cookiejar.CookieJar(policy=_RejectAllCookiesPolicy()),
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                max_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[key] = client
+    return client
+
+
+async def aclose_http_clients():
+    """关闭所有共享客户端（应用关闭时调用）"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def _build_proxy_url(scheme: str, host: str, port: int,
+                     username: Optional[str] = None, password: Optional[str] = None) -> str:
+    """构建代理URL，用户名和密码做百分号编码（其中的@、:等字符不会破坏URL）"""
+    netloc = f"{host}:{port}"
+    if username and password:
+        netloc = f"{quote(username, safe='')}:{quote(password, safe='')}@{netloc}"
+    return urlunsplit((scheme, netloc, "", "", ""))
+
+
+@functools.lru_cache(maxsize=256)
+def _build_proxy_config(label: str, proxy_type: Optional[str],
+                        proxy_host: Optional[str], proxy_port: Optional[int],
+                        proxy_username: Optional[str], proxy_password: Optional[str]) -> Optional[str]:
+    """根据代理字段创建httpx代理配置（调用方已确认启用代理），label用于日志（如"Channel xxx"）
+    
+    结果按参数缓存：每个请求都会重新构造ChannelInfo，但同一渠道的代理字段不变，
+    只有首次（或代理配置修改后）才会构建URL和输出日志。
+    """
     if not proxy_host or not proxy_port:
-        logger.warning(f"Channel {channel_info.name}: Proxy enabled but missing host/port")
+        logger.warning(f"{label}: Proxy enabled but missing host/port")
         return None
     
-    proxy_type = getattr(channel_info, 'proxy_type', 'http').lower()
-    proxy_username = getattr(channel_info, 'proxy_username', None)
-    proxy_password = getattr(channel_info, 'proxy_password', None)
+    proxy_type = (proxy_type or 'http').lower()
     
-    # 验证代理类型并构建URL
+    # 验证代理类型
     if proxy_type == 'socks5':
-        try:
-            import socksio  # 检查是否安装了SOCKS支持
-            proxy_scheme = "socks5"
-        except ImportError:
-            logger.error(f"Channel {channel_info.name}: SOCKS5 proxy requires 'httpx[socks]'. Please install: pip install httpx[socks]")
+        if not _HAS_SOCKSIO:
+            logger.error(f"{label}: SOCKS5 proxy requires 'httpx[socks]'. Please install: pip install httpx[socks]")
             return None
+        proxy_scheme = "socks5"
     elif proxy_type in ['http', 'https']:
         proxy_scheme = proxy_type
     else:
-        logger.error(f"Channel {channel_info.name}: Unsupported proxy type '{proxy_type}'. Supported types: http, https, socks5")
+        logger.error(f"{label}: Unsupported proxy type '{proxy_type}'. Supported types: http, https, socks5")
         return None
     
-    # 构建代理URL
-    proxy_url = f"{proxy_scheme}://"
+    # 在日志中隐藏用户名密码
     if proxy_username and proxy_password:
-        # 在日志中隐藏用户名密码
-        logger.info(f"Channel {channel_info.name}: Using authenticated proxy {proxy_scheme}://{proxy_host}:{proxy_port}")
-        proxy_url += f"{proxy_username}:{proxy_password}@"
+        logger.info(f"{label}: Using authenticated proxy {proxy_scheme}://{proxy_host}:{proxy_port}")
     else:
-        logger.info(f"Channel {channel_info.name}: Using proxy {proxy_scheme}://{proxy_host}:{proxy_port}")
+        logger.info(f"{label}: Using proxy {proxy_scheme}://{proxy_host}:{proxy_port}")
     
-    proxy_url += f"{proxy_host}:{proxy_port}"
+    # httpx的proxies传入单个URL即对所有请求（http/https）使用该代理
+    proxy_url = _build_proxy_url(proxy_scheme, proxy_host, proxy_port, proxy_username, proxy_password)
     
-    # 对于SOCKS5代理，只需要一个通用配置
-    if proxy_type == 'socks5':
-        proxy_config = {
-            "all://": proxy_url
-        }
-    else:
-        # HTTP/HTTPS代理需要分别配置
-        proxy_config = {
-            "http://": proxy_url,
-            "https://": proxy_url
-        }
-    
-    logger.debug(f"Channel {channel_info.name}: Created proxy config for {proxy_type.upper()} requests")
-    return proxy_config
+    logger.debug(f"{label}: Created proxy config for {proxy_type.upper()} requests")
+    return proxy_url
 
 
-def create_proxy_config_from_channel_config(channel_config: ChannelConfig) -> Optional[Dict[str, str]]:
-    """从渠道配置创建代理配置"""
-    if not getattr(channel_config, 'use_proxy', False):
-        logger.debug(f"Config for {channel_config.provider}: Proxy disabled")
-        return None
-    
-    if not channel_config.proxy_host or not channel_config.proxy_port:
-        logger.warning(f"Config for {channel_config.provider}: Proxy enabled but missing host/port")
+# 一次C层调用取出ChannelInfo/ChannelConfig的代理字段，顺序与_build_proxy_config参数一致
+_proxy_fields = operator.attrgetter(
+    'proxy_type', 'proxy_host', 'proxy_port', 'proxy_username', 'proxy_password'
+)
+
+
+def create_proxy_config(channel_info: ChannelInfo) -> Optional[str]:
+    """从渠道信息创建代理配置（代理URL，未启用或配置无效时为None）"""
+    if not channel_info.use_proxy:
+        logger.debug("Channel %s: Proxy disabled", channel_info.name)
         return None
-    
-    proxy_type = (channel_config.proxy_type or 'http').lower()
-    
-    # 验证代理类型并构建URL
-    if proxy_type == 'socks5':
-        try:
-            import socksio  # 检查是否安装了SOCKS支持
-            proxy_scheme = "socks5"
-        except ImportError:
-            logger.error(f"Config for {channel_config.provider}: SOCKS5 proxy requires 'httpx[socks]'. Please install: pip install httpx[socks]")
-            return None
-    elif proxy_type in ['http', 'https']:
-        proxy_scheme = proxy_type
-    else:
-        logger.error(f"Config for {channel_config.provider}: Unsupported proxy type '{proxy_type}'. Supported types: http, https, socks5")
+    return _build_proxy_config(f"Channel {channel_info.name}", *_proxy_fields(channel_info))
+
+
+def create_proxy_config_from_channel_config(channel_config: ChannelConfig) -> Optional[str]:
+    """从渠道配置创建代理配置（代理URL，未启用或配置无效时为None）"""
+    if not channel_config.use_proxy:
+        logger.debug("Config for %s: Proxy disabled", channel_config.provider)
         return None
-    
-    # 构建代理URL
-    proxy_url = f"{proxy_scheme}://"
-    if channel_config.proxy_username and channel_config.proxy_password:
-        logger.info(f"Config for {channel_config.provider}: Using authenticated proxy {proxy_scheme}://{channel_config.proxy_host}:{channel_config.proxy_port}")
-        proxy_url += f"{channel_config.proxy_username}:{channel_config.proxy_password}@"
-    else:
-        logger.info(f"Config for {channel_config.provider}: Using proxy {proxy_scheme}://{channel_config.proxy_host}:{channel_config.proxy_port}")
-    
-    proxy_url += f"{channel_config.proxy_host}:{channel_config.proxy_port}"
-    
-    # 对于SOCKS5代理，只需要一个通用配置
-    if proxy_type == 'socks5':
-        proxy_config = {
-            "all://": proxy_url
-        }
-    else:
-        # HTTP/HTTPS代理需要分别配置
-        proxy_config = {
-            "http://": proxy_url,
-            "https://": proxy_url
-        }
-    
-    logger.debug(f"Config for {channel_config.provider}: Created proxy config for {proxy_type.upper()} requests")
-    return proxy_config
+    return _build_proxy_config(f"Config for {channel_config.provider}", *_proxy_fields(channel_config))
 
 
 @asynccontextmanager
@@ -127,14 +137,14 @@ async def get_http_client(channel_info: ChannelInfo, timeout: float = 30.0):
     """获取配置了代理的HTTP客户端"""
     proxy_config = create_proxy_config(channel_info)
     
+    # 每个请求都会执行：日志参数延迟格式化
     if proxy_config:
-        logger.info(f"Channel {channel_info.name}: Creating HTTP client with proxy")
-        logger.debug(f"Channel {channel_info.name}: Proxy config keys: {list(proxy_config.keys())}")
+        logger.info("Channel %s: Using HTTP client with proxy", channel_info.name)
     else:
-        logger.debug(f"Channel {channel_info.name}: Creating HTTP client without proxy")
+        logger.debug("Channel %s: Using HTTP client without proxy", channel_info.name)
     
-    async with httpx.AsyncClient(timeout=timeout, proxies=proxy_config) as client:
-        yield client
+    # 共享客户端在退出上下文时不关闭，连接留在池中供后续请求复用
+    yield _get_shared_client(proxy_config, timeout)
 
 
 @asynccontextmanager  
@@ -142,11 +152,11 @@ async def get_http_client_from_config(channel_config: ChannelConfig, timeout: fl
     """从渠道配置获取配置了代理的HTTP客户端"""
     proxy_config = create_proxy_config_from_channel_config(channel_config)
     
+    # 每个请求都会执行：日志参数延迟格式化
     if proxy_config:
-        logger.info(f"Config for {channel_config.provider}: Creating HTTP client with proxy")
-        logger.debug(f"Config for {channel_config.provider}: Proxy config keys: {list(proxy_config.keys())}")
+        logger.info("Config for %s: Using HTTP client with proxy", channel_config.provider)
     else:
-        logger.debug(f"Config for {channel_config.provider}: Creating HTTP client without proxy")
+        logger.debug("Config for %s: Using HTTP client without proxy", channel_config.provider)
     
-    async with httpx.AsyncClient(timeout=timeout, proxies=proxy_config) as client:
-        yield client
\ No newline at end of file
+    # 共享客户端在退出上下文时不关闭，连接留在池中供后续请求复用
+    yield _get_shared_client(proxy_config, timeout)
\ No newline at end of file
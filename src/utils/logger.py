@@ -4,51 +4,59 @@
 """
 import logging
 import logging.handlers
+import atexit
+import queue
 import sys
 import os
+import threading
 from pathlib import Path
 from typing import Optional
 
-# 全局日志器缓存，避免重复创建
+# 日志配置在模块加载时读取一次，之后创建日志器不再重复导入和取属性
+try:
+    from src.utils.env_config import env_config
+    _LOG_LEVEL = getattr(logging, env_config.log_level.upper())
+    _LOG_FILE = env_config.log_file
+    _LOG_MAX_DAYS = env_config.log_max_days
+except ImportError:
+    # 如果无法导入环境配置，使用默认值
+    _LOG_LEVEL = logging.WARNING
+    _LOG_FILE = "logs/app.log"
+    _LOG_MAX_DAYS = 1
+
+# 设置该环境变量时（多工作进程启动），每个进程写入带PID后缀的独立日志文件，
+# 避免多个进程各自轮转同一文件
+LOG_FILE_PER_PROCESS_ENV = "LOG_FILE_PER_PROCESS"
+if os.environ.get(LOG_FILE_PER_PROCESS_ENV):
+    _LOG_FILE = f"{_LOG_FILE}.{os.getpid()}"
+
+# 全局日志器缓存，避免重复创建；命中时只做一次字典读取，创建时加锁
 _loggers = {}
+_loggers_lock = threading.Lock()
 
+# 旧日志清理是否已启动（每个进程只执行一次）
+_cleanup_started = False
 
-def setup_logger(name: str, level: str = None) -> logging.Logger:
-    """设置日志器"""
-    # 如果已经创建过，直接返回
-    if name in _loggers:
-        return _loggers[name]
-
-    # 导入环境配置
-    try:
-        from src.utils.env_config import env_config
-        log_level = level or env_config.log_level
-        log_file = env_config.log_file
-        log_max_days = env_config.log_max_days
-    except ImportError:
-        # 如果无法导入环境配置，使用默认值
-        log_level = level or "WARNING"
-        log_file = "logs/app.log"
-        log_max_days = 1
+# 日志格式（格式化器无状态，所有处理器共用一个）
+_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, log_level.upper()))
-
-    # 清除现有处理器
-    logger.handlers.clear()
+# 所有日志器共享的QueueHandler：记录入队后由后台线程交给控制台/文件处理器写出，
+# 请求线程不再阻塞在文件写入和轮转检查上
+_queue_handler = None
+_queue_lock = threading.Lock()
 
-    # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
 
+def _create_output_handlers(log_file: str, log_max_days: int) -> list:
+    """创建实际输出的控制台和文件处理器（整个进程各一个，级别由各日志器自己过滤）"""
     # 创建控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(getattr(logging, log_level.upper()))
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(_FORMATTER)
+    handlers = [console_handler]
 
-    # 创建文件处理器（时间轮转）
+    # 创建文件处理器（时间轮转）；同一文件只由一个处理器写入和轮转，
+    # 避免多个处理器在午夜各自轮转同一文件而互相覆盖备份
     try:
         # 确保日志目录存在
         log_path = Path(log_file)
@@ -67,14 +75,13 @@ def setup_logger(name: str, level: str = None) -> logging.Logger:
         # 设置轮转文件的命名格式
         file_handler.suffix = "%Y-%m-%d"
 
-        file_handler.setLevel(getattr(logging, log_level.upper()))
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        file_handler.setFormatter(_FORMATTER)
+        handlers.append(file_handler)
 
     except Exception as e:
         # 文件处理器失败时仅打印一次警告，不中断程序
         console_handler.emit(logging.LogRecord(
-            name=name,
+            name=__name__,
             level=logging.WARNING,
             pathname="",
             lineno=0,
@@ -83,9 +90,59 @@ def setup_logger(name: str, level: str = None) -> logging.Logger:
             exc_info=None
         ))
 
+    return handlers
+
+
+def _get_queue_handler(log_file: str, log_max_days: int) -> logging.handlers.QueueHandler:
+    """获取共享的QueueHandler，首次调用时创建输出处理器并启动后台写日志线程（进程退出时写完队列）"""
+    global _queue_handler
+    with _queue_lock:
+        if _queue_handler is None:
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(
+                log_queue, *_create_output_handlers(log_file, log_max_days)
+            )
+            listener.start()
+            atexit.register(listener.stop)
+            _queue_handler = logging.handlers.QueueHandler(log_queue)
+        return _queue_handler
+
+
+def setup_logger(name: str, level: str = None) -> logging.Logger:
+    """设置日志器"""
+    # 如果已经创建过，直接返回（无锁快速路径）
+    logger = _loggers.get(name)
+    if logger is not None:
+        return logger
+
+    with _loggers_lock:
+        # 加锁后再检查一次，避免并发启动时重复创建同一日志器
+        logger = _loggers.get(name)
+        if logger is not None:
+            return logger
+        return _create_logger(name, level)
+
+
+def _create_logger(name: str, level: Optional[str]) -> logging.Logger:
+    """创建并缓存日志器（调用方需持有_loggers_lock）"""
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, level.upper()) if level else _LOG_LEVEL)
+
+    # 清除现有处理器（日志器可能已由logging.getLogger在别处创建并挂过处理器）
+    logger.handlers.clear()
+
+    # 日志器只挂共享的QueueHandler，低于日志器级别的记录不会入队
+    logger.addHandler(_get_queue_handler(_LOG_FILE, _LOG_MAX_DAYS))
+
     # 防止日志传播到根日志器
     logger.propagate = False
 
+    # 首个日志器创建后在后台清理旧日志，不阻塞启动
+    global _cleanup_started
+    if not _cleanup_started:
+        _cleanup_started = True
+        threading.Thread(target=cleanup_old_logs, name="log-cleanup", daemon=True).start()
+
     # 缓存日志器
     _loggers[name] = logger
 
@@ -100,32 +157,31 @@ def get_logger(name: str) -> logging.Logger:
 def cleanup_old_logs():
     """清理旧的日志文件"""
     try:
-        from src.utils.env_config import env_config
-        log_file = env_config.log_file
-        log_max_days = env_config.log_max_days
-
-        log_path = Path(log_file)
+        log_path = Path(_LOG_FILE)
         log_dir = log_path.parent
+        prefix = f"{log_path.stem}."
 
         if not log_dir.exists():
             return
 
         import time
         current_time = time.time()
-        max_age = log_max_days * 24 * 60 * 60  # 转换为秒
-
-        # 清理旧的日志文件
-        for file_path in log_dir.glob(f"{log_path.stem}.*"):
-            if file_path.stat().st_mtime < (current_time - max_age):
+        max_age = _LOG_MAX_DAYS * 24 * 60 * 60  # 转换为秒
+        cutoff = current_time - max_age
+
+        # 清理旧的日志文件（scandir一次遍历目录，不构造Path对象；
+        # 当前日志文件已被处理器打开，跳过，由处理器自己轮转）
+        with os.scandir(log_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith(prefix) or entry.name == log_path.name:
+                    continue
                 try:
-                    file_path.unlink()
-                    print(f"Cleaned up old log file: {file_path}")
+                    if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                        continue
+                    os.unlink(entry.path)
+                    print(f"Cleaned up old log file: {entry.path}")
                 except Exception as e:
-                    print(f"Failed to clean up log file {file_path}: {e}")
+                    print(f"Failed to clean up log file {entry.path}: {e}")
 
     except Exception as e:
         print(f"Failed to cleanup old logs: {e}")
-
-
-# 在模块加载时清理旧日志
-cleanup_old_logs()
\ No newline at end of file
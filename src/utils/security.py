@@ -2,10 +2,67 @@
 安全工具函数
 提供敏感信息掩码和安全日志功能
 """
+import functools
 import json
 import re
-from typing import Any, Dict, Union
-from copy import deepcopy
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from src.utils.env_config import env_config
+
+try:
+    # 可选依赖：Rust实现的JSON编码器，比标准库json快数倍，输出格式一致
+    import orjson
+except ImportError:
+    orjson = None
+
+# 日志用的JSON编码器：默认紧凑输出（编码更快、截断前能容纳更多内容），
+# DEBUG_MODE开启时缩进2格便于阅读；可逐段编码
+if env_config.debug_mode:
+    _LOG_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, indent=2)
+else:
+    _LOG_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+if orjson is not None:
+    _ORJSON_OPTION = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if env_config.debug_mode else 0)
+
+
+def _dump_log_json(data: Any) -> str:
+    """按日志格式编码整个对象（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(data, option=_ORJSON_OPTION).decode()
+    return _LOG_JSON_ENCODER.encode(data)
+
+
+# 默认的敏感字段名（字段名小写后包含其中任意一个即视为敏感）
+_DEFAULT_SENSITIVE_KEYS = (
+    'api_key', 'apikey', 'key', 'token', 'password', 'secret', 
+    'authorization', 'auth', 'x-api-key', 'x-goog-api-key',
+    'bearer', 'access_token', 'refresh_token'
+)
+
+
+@functools.lru_cache(maxsize=32)
+def _sensitive_key_matcher(sensitive_keys: Tuple[str, ...]) -> Callable[[str], Optional["re.Match"]]:
+    """把敏感字段名列表编译为一个不区分大小写的子串匹配正则（按列表缓存）"""
+    if not sensitive_keys:
+        return lambda key: None
+    return re.compile("|".join(map(re.escape, sensitive_keys)), re.IGNORECASE).search
+
+
+_DEFAULT_SENSITIVE_KEY_SEARCH = _sensitive_key_matcher(_DEFAULT_SENSITIVE_KEYS)
+
+
+def _get_sensitive_key_search(sensitive_keys) -> Callable[[str], Optional["re.Match"]]:
+    """获取敏感字段名列表对应的匹配函数（默认列表直接使用预编译的）"""
+    if sensitive_keys is _DEFAULT_SENSITIVE_KEYS:
+        return _DEFAULT_SENSITIVE_KEY_SEARCH
+    return _sensitive_key_matcher(tuple(sensitive_keys))
+
+
+# 掩码结果缓存：同一个key（如每个请求携带的Bearer token）会被反复掩码；
+# 超长输入多半是误传入的内容而不是key，不进缓存
+_MASK_CACHE_SIZE = 4096
+_MASK_CACHE_MAX_INPUT = 512
 
 
 def mask_api_key(api_key: str, prefix_length: int = 4) -> str:
@@ -22,6 +79,13 @@ def mask_api_key(api_key: str, prefix_length: int = 4) -> str:
     if not api_key:
         return "***empty***"
     
+    if len(api_key) > _MASK_CACHE_MAX_INPUT:
+        return _mask_api_key(api_key, prefix_length)
+    return _mask_api_key_cached(api_key, prefix_length)
+
+
+def _mask_api_key(api_key: str, prefix_length: int) -> str:
+    """mask_api_key的实际实现（api_key非空）"""
     if len(api_key) <= prefix_length:
         return "*" * len(api_key)
     
@@ -30,6 +94,9 @@ def mask_api_key(api_key: str, prefix_length: int = 4) -> str:
     return f"{api_key[:prefix_length]}{'*' * masked_length}"
 
 
+_mask_api_key_cached = functools.lru_cache(maxsize=_MASK_CACHE_SIZE)(_mask_api_key)
+
+
 def mask_sensitive_data(data: Union[Dict[str, Any], str], sensitive_keys: list = None) -> Union[Dict[str, Any], str]:
     """
     递归地掩码数据中的敏感信息
@@ -42,73 +109,164 @@ def mask_sensitive_data(data: Union[Dict[str, Any], str], sensitive_keys: list =
         掩码后的数据副本
     """
     if sensitive_keys is None:
-        sensitive_keys = [
-            'api_key', 'apikey', 'key', 'token', 'password', 'secret', 
-            'authorization', 'auth', 'x-api-key', 'x-goog-api-key',
-            'bearer', 'access_token', 'refresh_token'
-        ]
-    
+        sensitive_keys = _DEFAULT_SENSITIVE_KEYS
+    # 敏感字段匹配函数只解析一次，递归时直接传递
+    return _mask_impl(data, _get_sensitive_key_search(sensitive_keys))
+
+
+def _mask_impl(data: Any, is_sensitive: Callable[[str], Optional["re.Match"]]) -> Any:
+    """mask_sensitive_data的递归实现"""
     if isinstance(data, str):
+        # 快速预检：既没有任何敏感字段名子串（含\u转义时无法判断），也没有任何key模式时，
+        # 解析后也不会有内容被掩码，直接原样返回，省去JSON解析和重新编码
+        if '\\u' not in data and not _MASK_PATTERN_RE.search(data) and not is_sensitive(data):
+            return data
+        
         # 如果是字符串，尝试解析为JSON
         try:
             parsed = json.loads(data)
-            masked = mask_sensitive_data(parsed, sensitive_keys)
-            return json.dumps(masked, ensure_ascii=False, indent=2)
+            masked = _mask_impl(parsed, is_sensitive)
+            return _dump_log_json(masked)
         except (json.JSONDecodeError, TypeError):
             # 如果不是JSON，检查是否包含API key模式
             return _mask_string_patterns(data)
     
     elif isinstance(data, dict):
-        # 深拷贝避免修改原始数据
-        masked_data = deepcopy(data)
+        # 逐字段构建新字典，不修改原始数据（无需先深拷贝再覆盖）
+        masked_data = {}
         
-        for key, value in masked_data.items():
-            key_lower = key.lower()
-            
+        for key, value in data.items():
             # 检查是否是敏感字段
-            if any(sensitive_key in key_lower for sensitive_key in sensitive_keys):
+            if is_sensitive(key):
                 if isinstance(value, str):
                     masked_data[key] = mask_api_key(value)
                 else:
                     masked_data[key] = "***masked***"
             elif isinstance(value, (dict, list)):
                 # 递归处理嵌套结构
-                masked_data[key] = mask_sensitive_data(value, sensitive_keys)
+                masked_data[key] = _mask_impl(value, is_sensitive)
+            else:
+                masked_data[key] = value
         
         return masked_data
     
     elif isinstance(data, list):
         # 处理列表
-        return [mask_sensitive_data(item, sensitive_keys) for item in data]
+        return [_mask_impl(item, is_sensitive) for item in data]
     
     else:
         # 其他类型直接返回
         return data
 
 
+# 常见的API key模式，合并为一个正则一次扫描；同一位置按顺序优先匹配前面的模式
+_MASK_PATTERN_RE = re.compile("|".join([
+    # OpenAI格式: sk-开头
+    r'(?P<openai>sk-[a-zA-Z0-9]{48})',
+    # Anthropic格式: sk-ant-开头
+    r'(?P<anthropic>sk-ant-[a-zA-Z0-9\-_]{95})',
+    # Google格式: 39字符的字母数字
+    r'(?P<google>AIza[a-zA-Z0-9_\-]{35})',
+    # Bearer token
+    r'(?P<bearer>Bearer\s+[a-zA-Z0-9\-_\.]{20,})',
+    # 通用长字符串（可能是key）
+    r'(?P<generic>[a-zA-Z0-9\-_]{32,})',
+]))
+
+
+def _mask_pattern_match(match: "re.Match") -> str:
+    """按命中的模式掩码，Bearer token保留前缀"""
+    if match.lastgroup == 'bearer':
+        return f"Bearer {mask_api_key(match.group()[7:])}"
+    return mask_api_key(match.group())
+
+
+def _has_candidate(text: str) -> bool:
+    """是否可能包含key模式：通用模式至少32个字符，更短的匹配只能来自带固定前缀的模式"""
+    return len(text) >= 32 or 'sk-' in text or 'AIza' in text or 'Bearer' in text
+
+
 def _mask_string_patterns(text: str) -> str:
     """
     掩码字符串中的API key模式
     """
-    # 常见的API key模式
-    patterns = [
-        # OpenAI格式: sk-开头
-        (r'sk-[a-zA-Z0-9]{48}', lambda m: mask_api_key(m.group())),
-        # Anthropic格式: sk-ant-开头
-        (r'sk-ant-[a-zA-Z0-9\-_]{95}', lambda m: mask_api_key(m.group())),
-        # Google格式: 39字符的字母数字
-        (r'AIza[a-zA-Z0-9_\-]{35}', lambda m: mask_api_key(m.group())),
-        # Bearer token
-        (r'Bearer\s+[a-zA-Z0-9\-_\.]{20,}', lambda m: f"Bearer {mask_api_key(m.group()[7:])}"),
-        # 通用长字符串（可能是key）
-        (r'[a-zA-Z0-9\-_]{32,}', lambda m: mask_api_key(m.group()) if len(m.group()) > 20 else m.group()),
-    ]
+    # 普通短文本用子串查找即可排除，不必走正则扫描
+    if not _has_candidate(text):
+        return text
+    return _MASK_PATTERN_RE.sub(_mask_pattern_match, text)
+
+
+# 不可能属于任何key模式的字符（\s只出现在Bearer与token之间）
+_NON_TOKEN_CHAR_RE = re.compile(r'[^a-zA-Z0-9\-_.]')
+
+
+def _encode_log_prefix(data: Union[Dict[str, Any], list], max_length: int) -> str:
+    """编码为JSON，长度超过max_length即停止（之后的内容反正会被截断）"""
+    chunks = []
+    size = 0
+    for chunk in _LOG_JSON_ENCODER.iterencode(data):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_length:
+            break
+    return "".join(chunks)
+
+
+def _iter_masked_json(data: Any, is_sensitive: Callable[[str], Optional["re.Match"]]):
+    """边遍历边掩码边输出紧凑JSON片段，结果与先mask_sensitive_data再编码一致
     
-    result = text
-    for pattern, replacer in patterns:
-        result = re.sub(pattern, replacer, result)
+    不构造掩码后的副本，调用方停止迭代后剩余部分既不掩码也不编码。
+    """
+    encode = _LOG_JSON_ENCODER.encode
+    if isinstance(data, dict):
+        yield '{'
+        first = True
+        for key, value in data.items():
+            sensitive = is_sensitive(key)
+            yield (f'{encode(key)}:' if first else f',{encode(key)}:')
+            first = False
+            if sensitive:
+                yield encode(mask_api_key(value)) if isinstance(value, str) else '"***masked***"'
+            elif isinstance(value, (dict, list)):
+                yield from _iter_masked_json(value, is_sensitive)
+            else:
+                yield encode(value)
+        yield '}'
+    elif isinstance(data, list):
+        yield '['
+        for index, item in enumerate(data):
+            if index:
+                yield ','
+            if isinstance(item, (dict, list)):
+                yield from _iter_masked_json(item, is_sensitive)
+            else:
+                yield encode(_mask_impl(item, is_sensitive))
+        yield ']'
+    else:
+        yield encode(_mask_impl(data, is_sensitive))
+
+
+def _masked_json_prefix(data: Union[Dict[str, Any], list], max_length: int) -> str:
+    """掩码并编码为紧凑JSON，长度超过max_length即停止"""
+    chunks = []
+    size = 0
+    for chunk in _iter_masked_json(data, _DEFAULT_SENSITIVE_KEY_SEARCH):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_length:
+            break
+    return "".join(chunks)
+
+
+def _mask_text_prefix(text: str, max_length: int) -> str:
+    """只掩码长文本中会显示出来的前缀
     
-    return result
+    掩码不会缩短文本，因此输入max_length之后的字符不会出现在截断后的输出中；
+    截断点延伸到所在token的末尾，保证被截断的key仍能完整匹配并掩码。
+    """
+    match = _NON_TOKEN_CHAR_RE.search(text, max_length)
+    end = match.start() if match else len(text)
+    return _mask_string_patterns(text[:end])
 
 
 def safe_log_data(data: Any, max_length: int = 1000) -> str:
@@ -123,12 +281,33 @@ def safe_log_data(data: Any, max_length: int = 1000) -> str:
         安全的日志字符串
     """
     try:
+        if isinstance(data, str) and len(data) > max_length:
+            # 超长字符串：JSON按结构掩码并逐段编码，其他文本只掩码会显示的前缀
+            try:
+                parsed = json.loads(data)
+            except (json.JSONDecodeError, TypeError):
+                log_str = _mask_text_prefix(data, max_length)
+                return log_str[:max_length] + "...[truncated]"
+            if isinstance(parsed, (dict, list)):
+                data = parsed
+        
+        if isinstance(data, (dict, list)) and not env_config.debug_mode:
+            # 紧凑输出时边掩码边编码，大请求体只处理会显示出来的前缀
+            log_str = _masked_json_prefix(data, max_length)
+            if len(log_str) > max_length:
+                log_str = log_str[:max_length] + "...[truncated]"
+            return log_str
+        
         # 先掩码敏感信息
         masked_data = mask_sensitive_data(data)
         
         # 转换为字符串
         if isinstance(masked_data, (dict, list)):
-            log_str = json.dumps(masked_data, ensure_ascii=False, indent=2)
+            # orjson整体编码也比标准库逐段编码快；没有orjson时超过长度即停止编码
+            if orjson is not None:
+                log_str = _dump_log_json(masked_data)
+            else:
+                log_str = _encode_log_prefix(masked_data, max_length)
         else:
             log_str = str(masked_data)
         
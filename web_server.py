@@ -5,20 +5,9 @@ Web服务器启动脚本
 import sys
 import os
 import argparse
-from pathlib import Path
 
-# 添加src目录到Python路径
-sys.path.insert(0, str(Path(__file__).parent / "src"))
-
-# 注册检测器
-from core.openai_detector import OpenAICapabilityDetector
-from core.anthropic_detector import AnthropicCapabilityDetector
-from core.gemini_detector import GeminiCapabilityDetector
-from core.capability_detector import CapabilityDetectorFactory
-
-CapabilityDetectorFactory.register("openai", OpenAICapabilityDetector)
-CapabilityDetectorFactory.register("anthropic", AnthropicCapabilityDetector)
-CapabilityDetectorFactory.register("gemini", GeminiCapabilityDetector)
+# 检测器在api.web_api导入时注册，这里不再重复
+from src.utils.logger import LOG_FILE_PER_PROCESS_ENV
 
 def main():
     # 导入环境配置
@@ -28,6 +17,7 @@ def main():
     parser.add_argument("--host", default="0.0.0.0", help="服务器主机地址 (默认: 0.0.0.0)")
     parser.add_argument("--port", type=int, default=env_config.web_port, help=f"服务器端口 (默认: {env_config.web_port})")
     parser.add_argument("--reload", action="store_true", help="开启自动重载 (开发模式)")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数 (默认: 1)")
     parser.add_argument("--debug", action="store_true", help="开启调试模式")
 
     args = parser.parse_args()
@@ -59,18 +49,32 @@ def main():
     
     if args.reload:
         print("⚠️  开发模式：自动重载已启用")
+    elif args.workers > 1:
+        # 多个工作进程各自写独立的日志文件，避免午夜轮转时互相重命名同一文件而丢日志
+        os.environ[LOG_FILE_PER_PROCESS_ENV] = "1"
+        # 进程内的会话/渠道缓存无法感知其他进程中的登出和渠道修改，多进程时关闭
+        os.environ["MULTI_WORKER"] = "true"
+        print(f"👥 工作进程数: {args.workers}（日志按进程分文件）")
     
     import uvicorn
     
     # 设置日志级别
     log_level = "debug" if args.debug else "info"
     
+    # 自动重载和多进程模式下uvicorn需要import string在子进程中导入应用；
+    # 单进程时直接传入已导入的应用，避免再按字符串导入一遍
+    if args.reload or args.workers > 1:
+        app = "src.api.web_api:app"
+    else:
+        from src.api.web_api import app
+    
     # 启动服务器
     uvicorn.run(
-        "api.web_api:app",  # 使用import string格式
+        app,
         host=args.host,
         port=args.port,
         reload=args.reload,
+        workers=args.workers,
         log_level=log_level
     )
 